@@ -0,0 +1,71 @@
+"""Сравнение времени сохранения книги: потоковая запись против прежнего пути через pandas (bench.legacy_export).
+
+    python -m bench.export_bench [--teachers 200] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.legacy_export import save_workbook_openpyxl
+from bench.parity import load_corpus
+from logic.builder import build_tables
+from logic.main import MainLogic
+from logic.parser import parse_schedule
+
+
+def synthetic_schedules(count):
+    # Размножаем разобранные страницы корпуса до нужного числа преподавателей
+    parsed = []
+    for file_name, teacher_name, html in load_corpus():
+        schedule = parse_schedule(html, teacher_name)
+        if isinstance(schedule, tuple):
+            parsed.append((teacher_name, schedule))
+    teachers = []
+    odd_schedules = {}
+    even_schedules = {}
+    for i in range(count):
+        teacher_name, schedule = parsed[i % len(parsed)]
+        name = f"{teacher_name[:-1]} {i}."
+        teachers.append(name)
+        odd_schedules[name], even_schedules[name] = schedule
+    return teachers, odd_schedules, even_schedules
+
+
+def run(teacher_count=200, repeat=3):
+    teachers, odd_schedules, even_schedules = synthetic_schedules(teacher_count)
+    logic = MainLogic()
+    logic.teachers = [{"фио": name, "url": f"https://edu.sfu-kras.ru/timetable?teacher={i}"}
+                      for i, name in enumerate(teachers)]
+    odd_df, even_df, combined_df = build_tables(odd_schedules, even_schedules, teachers)
+    results = {"teachers": teacher_count, "rows": len(combined_df)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for engine in ("openpyxl", "stream"):
+            file_path = os.path.join(tmp_dir, f"{engine}.xlsx")
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                if engine == "stream":
+                    logic.save_workbook(file_path, odd_df, even_df, combined_df)
+                else:
+                    save_workbook_openpyxl(file_path, odd_df, even_df, combined_df, teachers, logic.get_teacher_urls())
+                timings.append(time.perf_counter() - start)
+            results[engine] = round(min(timings), 4)
+    results["speedup"] = round(results["openpyxl"] / results["stream"], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teachers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.teachers, args.repeat), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
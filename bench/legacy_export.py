@@ -0,0 +1,230 @@
+"""Прежняя запись книги: pandas.to_excel и донастройка каждой ячейки openpyxl.
+
+Приложение пишет книги через logic.export; этот путь оставлен только как база
+для сравнения скорости в bench.export_bench.
+"""
+import time
+
+from logic.export import WEEK_SHEETS, COMBINED_SHEET
+from logic.metrics import NULL_METRICS
+
+
+def save_workbook_openpyxl(file_path, odd_df, even_df, combined_df, teachers, teacher_urls=None, metrics=NULL_METRICS):
+    import pandas as pd
+    teacher_urls = teacher_urls or {}
+    with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+        with metrics.timer("formatting"):
+            odd_df.to_excel(writer, sheet_name=WEEK_SHEETS[0], index=False)
+            even_df.to_excel(writer, sheet_name=WEEK_SHEETS[1], index=False)
+            combined_df.to_excel(writer, sheet_name=COMBINED_SHEET, index=False, startrow=1)
+            for sheet_name in WEEK_SHEETS:
+                apply_formatting(writer.sheets[sheet_name], teachers, teacher_urls)
+            apply_combined_formatting(writer.sheets[COMBINED_SHEET], teachers, teacher_urls)
+        save_start = time.perf_counter()  # книга записывается при закрытии writer
+    metrics.stage("save", time.perf_counter() - save_start)
+
+
+def apply_combined_formatting(worksheet, teachers, teacher_urls):
+    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+    days_order = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+    header_fill = PatternFill(start_color="5f8a96", end_color="5f8a96", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    day_fill = PatternFill(start_color="ff6600", end_color="ff6600", fill_type="solid")
+    day_font = Font(bold=True, color="FFFFFF")
+    subject_fill = PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")
+    discipline_font = Font(color="5f8a96", bold=True)
+    default_font = Font(color="000000")
+    hyperlink_font = Font(color="5f8a96", bold=True, underline="single")
+    medium_border = Border(left=Side(style='medium', color='cccccc'),
+                           right=Side(style='medium', color='cccccc'),
+                           top=Side(style='medium', color='cccccc'),
+                           bottom=Side(style='medium', color='cccccc'))
+    thick_bottom_border = Border(bottom=Side(style='thick', color='5f8a96'))
+    day_alignment = Alignment(horizontal="left", vertical="center", indent=1, wrap_text=True)
+    center_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    cell_alignment = Alignment(horizontal="left", vertical="top", indent=1, wrap_text=True)
+
+    # Установка ширины столбцов
+    worksheet.column_dimensions['A'].width = 74 / 7.5  # №
+    worksheet.column_dimensions['B'].width = 100 / 7.5  # Время
+    for col in range(3, worksheet.max_column + 1):
+        max_length = 0
+        for row in range(2, worksheet.max_row + 1):
+            cell = worksheet.cell(row=row, column=col)
+            if cell.value:
+                text = str(cell.value)
+                lines = text.split('\n')
+                for line in lines:
+                    max_length = max(max_length, len(line))
+        adjusted_width = max_length + 2 if max_length > 0 else 10
+        worksheet.column_dimensions[get_column_letter(col)].width = adjusted_width
+
+    worksheet.cell(row=1, column=1).value = ""
+    worksheet.cell(row=1, column=2).value = ""
+
+    # Форматирование заголовков (строка 1 - имена преподавателей)
+    for teacher_idx, teacher in enumerate(teachers):
+        col_start = 3 + teacher_idx * 2  # Начало пары столбцов (Нечётная)
+        col_end = col_start + 1  # Конец пары столбцов (Чётная)
+        worksheet.merge_cells(start_row=1, start_column=col_start, end_row=1, end_column=col_end)
+        cell = worksheet.cell(row=1, column=col_start)
+        cell.value = teacher
+        cell.fill = subject_fill
+        cell.font = hyperlink_font
+        cell.alignment = center_alignment
+        cell.border = medium_border
+
+        # Добавляем гиперссылку если есть URL
+        if teacher_urls.get(teacher):
+            cell.hyperlink = teacher_urls[teacher]
+            # Явно переустанавливаем форматирование после гиперссылки
+            cell.font = hyperlink_font
+            cell.alignment = center_alignment
+
+    # Форматирование строки 2 (заголовки столбцов)
+    worksheet.row_dimensions[2].height = 15.75
+    for col in range(1, worksheet.max_column + 1):
+        cell = worksheet.cell(row=2, column=col)
+        if col == 1:
+            cell.value = "№"
+        elif col == 2:
+            cell.value = "Время"
+        elif col % 2 == 1:
+            cell.value = "Нечётная неделя"
+        else:
+            cell.value = "Чётная неделя"
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = center_alignment
+        cell.border = medium_border
+    # Форматирование данных
+    for row in range(3, worksheet.max_row + 1):
+        first_cell = worksheet.cell(row=row, column=1)
+        if first_cell.value in days_order:
+            worksheet.merge_cells(start_row=row, start_column=1, end_row=row, end_column=worksheet.max_column)
+            for col in range(1, worksheet.max_column + 1):
+                day_cell = worksheet.cell(row=row, column=col)
+                day_cell.fill = day_fill
+                day_cell.font = day_font
+                day_cell.alignment = day_alignment
+                day_cell.border = thick_bottom_border
+                if col == 1:
+                    day_cell.value = first_cell.value
+        else:
+            num_cell = worksheet.cell(row=row, column=1)
+            time_cell = worksheet.cell(row=row, column=2)
+            num_cell.alignment = center_alignment
+            time_cell.alignment = center_alignment
+            num_cell.border = medium_border
+            time_cell.border = medium_border
+            num_cell.font = default_font
+            time_cell.font = default_font
+            for col in range(3, worksheet.max_column + 1):
+                subject_cell = worksheet.cell(row=row, column=col)
+                if subject_cell.value:
+                    lines = str(subject_cell.value).split('\n')
+                    if len(lines) >= 3:
+                        subject_cell.value = "\n".join(lines)
+                        subject_cell.font = discipline_font
+                    elif len(lines) == 2:
+                        subject_cell.value = f"{lines[0]}\n{lines[1]}"
+                        subject_cell.font = discipline_font
+                    else:
+                        subject_cell.value = lines[0]
+                        subject_cell.font = default_font
+                subject_cell.fill = subject_fill
+                subject_cell.alignment = cell_alignment
+                subject_cell.border = medium_border
+
+def apply_formatting(worksheet, teachers, teacher_urls):
+    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+    days_order = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+    header_fill = PatternFill(start_color="5f8a96", end_color="5f8a96", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    day_fill = PatternFill(start_color="ff6600", end_color="ff6600", fill_type="solid")
+    day_font = Font(bold=True, color="FFFFFF")
+    subject_fill = PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")
+    discipline_font = Font(color="5f8a96", bold=True)
+    default_font = Font(color="000000")
+    hyperlink_font = Font(color="5f8a96", bold=True)
+    medium_border = Border(left=Side(style='medium', color='cccccc'),
+                           right=Side(style='medium', color='cccccc'),
+                           top=Side(style='medium', color='cccccc'),
+                           bottom=Side(style='medium', color='cccccc'))
+    thick_bottom_border = Border(bottom=Side(style='thick', color='5f8a96'))
+    day_alignment = Alignment(horizontal="left", vertical="center", indent=1, wrap_text=True)
+    center_alignment = Alignment(horizontal="center", vertical="center", indent=1, wrap_text=True)
+    cell_alignment = Alignment(horizontal="left", vertical="top", indent=1, wrap_text=True)
+
+    worksheet.column_dimensions['A'].width = 74 / 7.5
+    worksheet.column_dimensions['B'].width = 100 / 7.5
+    for col in range(3, worksheet.max_column + 1):
+        max_length = 0
+        for row in range(2, worksheet.max_row + 1):
+            cell = worksheet.cell(row=row, column=col)
+            if cell.value:
+                text = str(cell.value)
+                lines = text.split('\n')
+                for line in lines:
+                    max_length = max(max_length, len(line))
+        adjusted_width = max_length + 2 if max_length > 0 else 10
+        worksheet.column_dimensions[get_column_letter(col)].width = adjusted_width
+
+    for col in range(1, worksheet.max_column + 1):
+        cell = worksheet.cell(row=1, column=col)
+        if col <= 2:
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = center_alignment
+            cell.border = medium_border
+        else:
+            cell.fill = subject_fill
+            cell.font = hyperlink_font
+            cell.alignment = cell_alignment
+            cell.border = medium_border
+            teacher_index = col - 3
+            if teacher_index < len(teachers):
+                teacher = teachers[teacher_index]
+                if teacher_urls.get(teacher):
+                    cell.hyperlink = teacher_urls[teacher]
+                    cell.style = "Hyperlink"
+
+    for row in range(2, worksheet.max_row + 1):
+        first_cell = worksheet.cell(row=row, column=1)
+        if first_cell.value in days_order:
+            worksheet.merge_cells(start_row=row, start_column=1, end_row=row, end_column=worksheet.max_column)
+            for col in range(1, worksheet.max_column + 1):
+                day_cell = worksheet.cell(row=row, column=col)
+                day_cell.fill = day_fill
+                day_cell.font = day_font
+                day_cell.alignment = day_alignment
+                day_cell.border = thick_bottom_border
+                if col == 1:
+                    day_cell.value = first_cell.value
+        else:
+            num_cell = worksheet.cell(row=row, column=1)
+            time_cell = worksheet.cell(row=row, column=2)
+            num_cell.alignment = center_alignment
+            time_cell.alignment = center_alignment
+            num_cell.border = medium_border
+            time_cell.border = medium_border
+            num_cell.font = default_font
+            time_cell.font = default_font
+            for col in range(3, worksheet.max_column + 1):
+                subject_cell = worksheet.cell(row=row, column=col)
+                if subject_cell.value:
+                    lines = str(subject_cell.value).split('\n')
+                    if len(lines) >= 3:
+                        subject_cell.value = "\n".join(lines)
+                        subject_cell.font = discipline_font
+                    elif len(lines) == 2:
+                        subject_cell.value = f"{lines[0]}\n{lines[1]}"
+                        subject_cell.font = discipline_font
+                    else:
+                        subject_cell.value = lines[0]
+                        subject_cell.font = default_font
+                subject_cell.fill = subject_fill
+                subject_cell.alignment = cell_alignment
+                subject_cell.border = medium_border
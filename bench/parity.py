@@ -0,0 +1,93 @@
+"""Проверка, что все парсеры дают одинаковый результат на корпусе сохранённых страниц.
+
+    python -m bench.parity [каталог_с_страницами]
+
+В каталоге должен лежать manifest.json вида {"файл.html": "Фамилия И. О."}.
+Эталоном служит полный разбор через html.parser. Заодно проверяется выделение аудиторий
+из текста занятий (ROOM_CASES). Код возврата 1 - есть расхождения.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.parser import parse_schedule, available_backends, extract_room
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+REFERENCE_BACKEND = "html.parser"
+
+# Строка занятия -> ожидаемая аудитория (None - аудитории нет)
+ROOM_CASES = {
+    "корп. № 19 ауд. 211": "корп. № 19 ауд. 211",
+    "ауд. 5-14": "ауд. 5-14",
+    "Корпус № 3, аудитория 1-01": "корп. № 3 ауд. 1-01",
+    "Физика (практика)\nкорп. № 27 ауд. 270": "корп. № 27 ауд. 270",
+    "Аудиторная работа": None,
+    "Баудин А.": None,
+    "Баудин А.\nАудиторная работа": None,
+    "ЭИОС": None,
+}
+
+
+def load_corpus(directory=FIXTURES_DIR):
+    with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    corpus = []
+    for file_name, teacher_name in manifest.items():
+        with open(os.path.join(directory, file_name), "r", encoding="utf-8") as f:
+            corpus.append((file_name, teacher_name, f.read()))
+    return corpus
+
+
+def first_difference(expected, actual):
+    if isinstance(expected, str) or isinstance(actual, str):
+        return f"{expected!r} != {actual!r}"
+    for week, (expected_week, actual_week) in enumerate(zip(expected, actual), 1):
+        if list(expected_week) != list(actual_week):
+            return f"неделя {week}: дни {list(expected_week)} != {list(actual_week)}"
+        for day in expected_week:
+            for expected_lesson, actual_lesson in zip(expected_week[day], actual_week[day]):
+                if list(expected_lesson) != list(actual_lesson):
+                    return f"неделя {week}, {day}: {list(expected_lesson)!r} != {list(actual_lesson)!r}"
+            if len(expected_week[day]) != len(actual_week[day]):
+                return f"неделя {week}, {day}: разное число занятий"
+    return "различие в структуре результата"
+
+
+def check_parity(corpus, backends=None):
+    # Возвращает список (файл, парсер, описание расхождения)
+    backends = backends or [b for b in available_backends() if b != REFERENCE_BACKEND]
+    mismatches = []
+    for file_name, teacher_name, html in corpus:
+        expected = parse_schedule(html, teacher_name, backend=REFERENCE_BACKEND)
+        for backend in backends:
+            actual = parse_schedule(html, teacher_name, backend=backend)
+            if actual != expected:
+                mismatches.append((file_name, backend, first_difference(expected, actual)))
+    return mismatches
+
+
+def check_rooms(cases=ROOM_CASES):
+    # Возвращает список (строка, ожидаемая аудитория, найденная)
+    return [(text, expected, extract_room(text)) for text, expected in cases.items()
+            if extract_room(text) != expected]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    corpus = load_corpus(argv[0] if argv else FIXTURES_DIR)
+    mismatches = check_parity(corpus)
+    for file_name, backend, difference in mismatches:
+        print(f"{file_name} [{backend}]: {difference}")
+    room_mismatches = check_rooms()
+    for text, expected, actual in room_mismatches:
+        print(f"аудитория в {text!r}: ожидалось {expected!r}, найдено {actual!r}")
+    backends = ", ".join(b for b in available_backends() if b != REFERENCE_BACKEND)
+    print(f"Страниц: {len(corpus)}, парсеры: {backends}, расхождений: {len(mismatches)}, "
+          f"ошибок в аудиториях: {len(room_mismatches)}")
+    return 1 if mismatches or room_mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
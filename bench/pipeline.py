@@ -0,0 +1,162 @@
+"""Замер всего конвейера по этапам на локальном сервере (bench.server) и синтетических конфигах.
+
+    python -m bench.pipeline [--teachers 10 100 1000] [--latency 0.02] [--error-rate 0.0]
+                             [--parse-processes N] [--output result.json] [--compare previous.json]
+
+Этапы замеряются отдельно: чтение конфига, скачивание страниц, разбор (parse_schedule),
+скачивание с разбором как в приложении (get_schedule), сборка таблиц и сохранение книги
+с оформлением. Результат - JSON; --compare печатает отношение времён к прошлому замеру.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.server import FixtureServer
+from logic.fetcher import fetch_concurrently, DEFAULT_MAX_WORKERS
+from logic.main import MainLogic, prewarm_imports
+
+STAGES = ["config", "fetch", "parse", "fetch_and_parse", "build", "save"]
+
+
+def write_config(file_path, teachers):
+    # Синтетический конфиг в формате приложения: ФИО и ссылка, без заголовка
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for teacher in teachers:
+        sheet.append([teacher["фио"], teacher["url"]])
+    workbook.save(file_path)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(server, teacher_count, tmp_dir, max_workers, parse_processes=None):
+    from logic.builder import build_tables
+    from logic.parse_cache import ParseCache
+    from logic.parser import parse_schedule
+    from logic.transport import HttpTransport, FetchError
+
+    config_path = os.path.join(tmp_dir, f"config_{teacher_count}.xlsx")
+    write_config(config_path, server.teachers(teacher_count))
+    # Без дисковых кэшей: каждая страница честно скачивается и разбирается
+    logic = MainLogic(max_workers=max_workers, transport=HttpTransport(pool_size=max_workers), use_cache=False)
+    logic._parse_cache = ParseCache(os.path.join(tmp_dir, "parsed"))
+    logic.keep_snapshots = False
+    logic.keep_store = False
+    logic.parse_processes = parse_processes
+    timings = {}
+
+    start = time.perf_counter()
+    logic.load_config_file(config_path)
+    timings["config"] = time.perf_counter() - start
+
+    def fetch_page(url):
+        try:
+            return logic.transport.fetch(url, use_cache=False)[0]
+        except FetchError as e:
+            return str(e)
+
+    jobs = [(teacher["фио"], (teacher["url"],)) for teacher in logic.teachers]
+    start = time.perf_counter()
+    pages = fetch_concurrently(jobs, fetch_page, max_workers=max_workers)
+    timings["fetch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for teacher_name, html in pages.items():
+        parse_schedule(html, teacher_name)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    logic.create_combined_schedule(check_only=True)
+    timings["fetch_and_parse"] = time.perf_counter() - start
+
+    teachers = [name for name, schedule in logic.teachers_schedule.items() if isinstance(schedule, tuple)]
+    odd_schedules = {name: logic.teachers_schedule[name][0] for name in teachers}
+    even_schedules = {name: logic.teachers_schedule[name][1] for name in teachers}
+    start = time.perf_counter()
+    odd_df, even_df, combined_df = build_tables(odd_schedules, even_schedules, teachers)
+    timings["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    logic.save_workbook(os.path.join(tmp_dir, f"schedule_{teacher_count}.xlsx"), odd_df, even_df, combined_df)
+    timings["save"] = time.perf_counter() - start
+
+    logic.close()
+    return {
+        "teachers": teacher_count,
+        "ok": len(teachers),
+        "failed": teacher_count - len(teachers),
+        "stages": {stage: round(timings[stage], 4) for stage in STAGES},
+        "total": round(sum(timings.values()), 4),
+    }
+
+
+def run(teacher_counts=(10, 100, 1000), latency=0.02, jitter=0.0, error_rate=0.0, max_workers=DEFAULT_MAX_WORKERS,
+        parse_processes=None):
+    prewarm_imports()  # импорт библиотек не должен попадать в первый замер
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "settings": {"latency": latency, "jitter": jitter, "error_rate": error_rate, "workers": max_workers,
+                     "parse_processes": parse_processes},
+        "runs": [],
+    }
+    with FixtureServer(latency=latency, jitter=jitter, error_rate=error_rate) as server, \
+            tempfile.TemporaryDirectory() as tmp_dir:
+        for teacher_count in teacher_counts:
+            results["runs"].append(run_size(server, teacher_count, tmp_dir, max_workers, parse_processes))
+    return results
+
+
+def compare(previous, current):
+    # {число преподавателей: {этап: текущее / прошлое}}; меньше 1 - стало быстрее
+    previous_runs = {run["teachers"]: run for run in previous["runs"]}
+    ratios = {}
+    for run in current["runs"]:
+        before = previous_runs.get(run["teachers"])
+        if before is None:
+            continue
+        ratios[run["teachers"]] = {stage: round(run["stages"][stage] / before["stages"][stage], 2)
+                                   for stage in STAGES if before["stages"].get(stage)}
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teachers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка ответа сервера, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, до N с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--parse-processes", type=int, default=None,
+                        help="процессы для разбора в fetch_and_parse (по умолчанию - по числу ядер, 1 - в потоках загрузки)")
+    parser.add_argument("--output", help="сохранить результат в JSON-файл")
+    parser.add_argument("--compare", metavar="JSON", help="сравнить с результатом прошлого замера")
+    args = parser.parse_args()
+
+    results = run(args.teachers, args.latency, args.jitter, args.error_rate, args.workers, args.parse_processes)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+            results["compare"] = {"revision": previous.get("revision"), "ratios": compare(previous, results)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Локальная замена сайта расписания СФУ для замеров: отдаёт страницы корпуса bench/fixtures
+с настраиваемой задержкой и долей ошибок.
+
+    python -m bench.server [--port 8765] [--latency 0.05] [--error-rate 0.1]
+
+Преподаватель с номером i получает страницу корпуса i % N, в которой ФИО заменено на
+уникальное ("Иванов-12 И. И."), чтобы расписания разных преподавателей не схлопывались.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.parity import load_corpus
+
+# load_config_file принимает только ссылки на сайт СФУ, поэтому адрес сайта передаётся в запросе
+SITE_MARKER = "https://edu.sfu-kras.ru/timetable"
+
+
+def synthetic_name(teacher_name, number):
+    surname, initials = teacher_name.split(" ", 1)
+    return f"{surname}-{number} {initials}"
+
+
+def load_templates(corpus=None):
+    # Шаблоны - только страницы, которые разбираются без ошибок; ошибки даёт error_rate
+    from logic.parser import parse_schedule
+    corpus = corpus if corpus is not None else load_corpus()
+    return [(teacher_name, html) for file_name, teacher_name, html in corpus
+            if isinstance(parse_schedule(html, teacher_name), tuple)]
+
+
+class FixtureServer:
+    def __init__(self, templates=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=0, host="127.0.0.1", port=0):
+        self.templates = templates if templates is not None else load_templates()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, number):
+        return f"{self.base_url}/timetable?teacher={number}&site={SITE_MARKER}"
+
+    def teacher(self, number):
+        teacher_name, html = self.templates[number % len(self.templates)]
+        name = synthetic_name(teacher_name, number)
+        return name, html.replace(teacher_name, name)
+
+    def teachers(self, count):
+        return [{"фио": self.teacher(i)[0], "url": self.url_for(i)} for i in range(count)]
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.random_lock:
+                    server.requests += 1
+                    delay = server.latency + server.random.uniform(0, server.jitter)
+                    failed = server.random.random() < server.error_rate
+                    if failed:
+                        server.errors += 1
+                time.sleep(delay)
+                try:
+                    number = int(parse_qs(urlsplit(self.path).query)["teacher"][0])
+                except (KeyError, ValueError):
+                    self.send_error(404)
+                    return
+                if failed:
+                    self.send_error(503)
+                    return
+                body = server.teacher(number)[1].encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, до N с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    args = parser.parse_args()
+    server = FixtureServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, port=args.port)
+    print(f"Сервер: {server.url_for(0)}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Замер времени запуска приложения: импорт интерфейса и появление главного окна.
+
+    python -m bench.startup [--repeat 5] [--max-import 0.3] [--max-window 1.5]
+
+Каждый замер - в отдельном процессе (холодные импорты). Код возврата 1, если превышен
+бюджет времени или при старте уже загружены тяжёлые библиотеки (pandas, openpyxl, bs4, requests).
+Без дисплея замер окна пропускается.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY = ["pandas", "openpyxl", "bs4", "requests", "numpy"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import ui.main
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+# mainloop подменяется: одна отрисовка, замер и выход
+WINDOW_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import tkinter as tk
+def probe_mainloop(self, n=0):
+    self.update()
+    print(json.dumps({"seconds": time.perf_counter() - start,
+                      "heavy": [m for m in %r if m in sys.modules]}))
+    self.destroy()
+tk.Tk.mainloop = probe_mainloop
+try:
+    from logic.main import MainLogic
+    from ui.main import MainWindow
+    MainWindow(MainLogic(), prewarm=False)
+except tk.TclError as e:
+    print(json.dumps({"seconds": None, "heavy": [], "error": str(e)}))
+""" % (HEAVY,)
+
+
+def probe(code):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - start
+    return result
+
+
+def measure(probe_code, repeat):
+    runs = [probe(probe_code) for _ in range(repeat)]
+    if any(run["seconds"] is None for run in runs):
+        return {"seconds": None, "process_seconds": None, "heavy": [], "skipped": runs[0].get("error")}
+    return {
+        "seconds": round(min(run["seconds"] for run in runs), 4),
+        "process_seconds": round(min(run["process_seconds"] for run in runs), 4),
+        "heavy": sorted(set(sum((run["heavy"] for run in runs), []))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=0.3, help="бюджет на импорт интерфейса, с")
+    parser.add_argument("--max-window", type=float, default=1.5, help="бюджет до первой отрисовки окна, с")
+    args = parser.parse_args()
+
+    results = {"import": measure(IMPORT_PROBE, args.repeat), "window": measure(WINDOW_PROBE, args.repeat)}
+    failures = []
+    for name, budget in (("import", args.max_import), ("window", args.max_window)):
+        result = results[name]
+        if result["heavy"]:
+            failures.append(f"{name}: при старте загружены {', '.join(result['heavy'])}")
+        if result["seconds"] is not None and result["seconds"] > budget:
+            failures.append(f"{name}: {result['seconds']} с > бюджета {budget} с")
+    results["failures"] = failures
+    print(json.dumps(results, ensure_ascii=False))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
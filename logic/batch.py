@@ -0,0 +1,184 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from logic.builder import build_tables
+from logic.config import CONFIG_EXTENSIONS, load_config
+from logic.export import save_schedule_workbook
+from logic.fetcher import DEFAULT_MAX_WORKERS
+from logic.http_cache import HttpCache
+from logic.parse_cache import ParseCache
+from logic.parser import DEFAULT_BACKEND
+from logic.pipeline import ParseTask, fetch_parse_pipeline, parse_page_timed
+from logic.transport import HttpTransport, FetchError, format_attempts
+
+
+def find_configs(config_dir):
+    return sorted(os.path.join(config_dir, name) for name in os.listdir(config_dir)
+                  if name.lower().endswith(CONFIG_EXTENSIONS) and not name.startswith("~$"))
+
+
+def export_department(file_path, teachers, odd_schedules, even_schedules, teacher_urls, keep_groups):
+    # Выполняется в отдельном процессе: сборка таблиц и запись книги одного подразделения
+    try:
+        odd_df, even_df, combined_df = build_tables(odd_schedules, even_schedules, teachers, keep_groups=keep_groups)
+        save_schedule_workbook(file_path, odd_df, even_df, combined_df, teacher_urls)
+    except PermissionError:
+        return f"Ошибка сохранения таблицы, возможно в данный момент открыт изменяемый файл ({file_path})"
+    except OSError as e:
+        return f"Ошибка сохранения таблицы: {e}"
+    except Exception as e:
+        # Ошибка одного подразделения не должна обрывать сборку остальных
+        return f"Ошибка сборки таблицы: {e}"
+    return None
+
+
+class BatchRunner:
+    """Пакетная сборка таблиц для каталога конфигов (по одному на подразделение).
+
+    Все подразделения качают страницы через один пул соединений, каждая страница
+    скачивается и разбирается один раз за запуск, даже если преподаватель есть в нескольких
+    конфигах. Разбор страниц и запись книг распределяются по процессам.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, processes=None, use_cache=True, keep_groups=False,
+                 parser_backend=DEFAULT_BACKEND):
+        self.max_workers = max_workers
+        self.processes = processes
+        self.use_cache = use_cache
+        self.keep_groups = keep_groups
+        self.parser_backend = parser_backend
+        self.transport = HttpTransport(pool_size=max_workers, cache=HttpCache())
+        self.parse_cache = ParseCache()
+
+    def load_departments(self, config_paths):
+        departments = []
+        for config_path in config_paths:
+            department = {"config": config_path, "teachers": [], "error": None}
+            try:
+                department["teachers"] = load_config(config_path)
+            except Exception as e:
+                department["error"] = " ".join(map(str, e.args)) if e.args else str(e)
+            departments.append(department)
+        return departments
+
+    def fetch_and_parse(self, pages, pool, callback=None):
+        """pages - уникальные пары (ФИО, ссылка). Качает страницы в потоках и по мере готовности
+        отдаёт разбор в пул процессов через logic.pipeline: очередь на разбор ограничена, поэтому
+        в памяти не копятся все скачанные страницы. Возвращает {(ФИО, ссылка): (расписание, статус)}."""
+        names_by_url = {}
+        for teacher_name, url in pages:
+            names_by_url.setdefault(url, []).append(teacher_name)
+        backend = self.parser_backend
+
+        def fetch_page(teacher_names, url):
+            # {ФИО: (расписание, статус)} или ParseTask для ФИО, которых нет в кэше разбора
+            try:
+                html, attempts = self.transport.fetch(url, use_cache=self.use_cache)
+            except FetchError as e:
+                return {teacher_name: (str(e), str(e)) for teacher_name in teacher_names}
+            status = f"ok ({format_attempts(attempts)})" if len(attempts) > 1 else "ok"
+            results = {}
+            pending = []
+            for teacher_name in teacher_names:
+                schedule = self.parse_cache.get(teacher_name, html, backend) if self.use_cache else None
+                if schedule is not None:
+                    results[teacher_name] = (schedule, status)
+                else:
+                    pending.append(teacher_name)
+            if not pending:
+                return results
+
+            def finish(parsed):
+                for teacher_name, (schedule, _) in parsed.items():
+                    self.parse_cache.put(teacher_name, html, backend, schedule)
+                    results[teacher_name] = (schedule, status if isinstance(schedule, tuple) else schedule)
+                return results
+            return ParseTask((html, pending, backend), finish)
+
+        results = {}
+
+        def on_result(url, page_results):
+            if isinstance(page_results, str):  # исключение при загрузке или разборе страницы
+                page_results = {teacher_name: (page_results, page_results) for teacher_name in names_by_url[url]}
+            for teacher_name, (schedule, status) in page_results.items():
+                results[(teacher_name, url)] = (schedule, status)
+                if callback:
+                    callback(teacher_name, status)
+
+        fetch_parse_pipeline([(url, (names, url)) for url, names in names_by_url.items()], fetch_page,
+                             parse_page_timed, pool, max_workers=self.max_workers, callback=on_result)
+        self.transport.flush_cache()
+        self.parse_cache.prune()
+        return {page: results[page] for page in pages}
+
+    def run(self, config_dir, output_dir, callback=None):
+        os.makedirs(output_dir, exist_ok=True)
+        departments = self.load_departments(find_configs(config_dir))
+
+        # Каждая пара (ФИО, ссылка) качается и разбирается один раз на весь запуск
+        pages = []
+        seen = set()
+        for department in departments:
+            for teacher in department["teachers"]:
+                page = (teacher["фио"], teacher["url"])
+                if page not in seen:
+                    seen.add(page)
+                    pages.append(page)
+
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            results = self.fetch_and_parse(pages, pool, callback=callback)
+
+            exports = []
+            for department in departments:
+                name = os.path.splitext(os.path.basename(department["config"]))[0]
+                department["output"] = None
+                department["statuses"] = {}
+                teachers = []
+                odd_schedules = {}
+                even_schedules = {}
+                teacher_urls = {}
+                for teacher in department["teachers"]:
+                    schedule, status = results[(teacher["фио"], teacher["url"])]
+                    department["statuses"][teacher["фио"]] = status
+                    teacher_urls.setdefault(teacher["фио"], teacher["url"])
+                    if isinstance(schedule, tuple) and teacher["фио"] not in odd_schedules:
+                        teachers.append(teacher["фио"])
+                        odd_schedules[teacher["фио"]], even_schedules[teacher["фио"]] = schedule
+                if department["error"] is None and not teachers:
+                    department["error"] = "Не удалось загрузить ни одно расписание. Проверьте конфигурацию."
+                if department["error"] is None:
+                    file_path = os.path.join(output_dir, name + ".xlsx")
+                    future = pool.submit(export_department, file_path, teachers, odd_schedules, even_schedules,
+                                         teacher_urls, self.keep_groups)
+                    exports.append((department, file_path, future))
+                department["report"] = os.path.join(output_dir, name + ".status.json")
+
+            for department, file_path, future in exports:
+                try:
+                    error = future.result()
+                except Exception as e:  # процесс пула упал или результат не удалось передать
+                    error = f"Ошибка сборки таблицы: {e}"
+                if error:
+                    department["error"] = error
+                else:
+                    department["output"] = file_path
+
+        reports = []
+        for department in departments:
+            report = {
+                "config": department["config"],
+                "output": department["output"],
+                "error": department["error"],
+                "teachers": [{"name": name, "status": status, "ok": status.startswith("ok")}
+                             for name, status in department["statuses"].items()],
+            }
+            report["ok"] = sum(1 for teacher in report["teachers"] if teacher["ok"])
+            report["failed"] = len(report["teachers"]) - report["ok"]
+            with open(department["report"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            reports.append(report)
+        return reports
+
+    def close(self):
+        self.transport.close()
@@ -0,0 +1,101 @@
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+DAYS_ORDER = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
+SUBGROUP_PATTERN = re.compile(r'\s*\(?(\d+\s*подгрупп[а-я]*|подгрупп[а-я]*\s*\d+)\)?\s*', re.IGNORECASE)
+
+
+@lru_cache(maxsize=65536)
+def format_lesson(text, keep_groups):
+    # Текст занятия для ячейки: первая строка - группы, дальше дисциплина, аудитория и т.д.
+    lesson_all_info = text.split("\n")
+    if not keep_groups:
+        # Убираем подгруппы и повторы групп
+        groups_deleted_repeats = SUBGROUP_PATTERN.sub('', lesson_all_info[0]).split(", ")
+        unique_groups_names = ", ".join(set(groups_deleted_repeats))
+        return unique_groups_names + "\n" + "\n".join(lesson_all_info[1:])
+    # Оставляем подгруппы, но переносим строку после каждой второй группы
+    groups = lesson_all_info[0].split(", ")
+    changed_groups = []
+    for num_group in range(len(groups)):
+        if num_group % 2 != 0 or num_group + 1 == len(groups):
+            changed_groups.append(groups[num_group] + "\n")
+        else:
+            changed_groups.append(groups[num_group] + ", ")
+    return "".join(changed_groups) + "\n".join(lesson_all_info[1:])
+
+
+def _cell(schedule, day, slot, keep_groups):
+    if schedule is None or day not in schedule:
+        return ""
+    lesson = schedule.lesson_at(day, *slot)
+    if lesson and lesson.text.strip():
+        return format_lesson(lesson.text, keep_groups)
+    return ""
+
+
+def _sorted_slots(slots):
+    return sorted(list(slots), key=lambda x: int(x[0]))
+
+
+def build_tables(odd_schedules, even_schedules, teachers, keep_groups=False):
+    """За один проход по расписаниям строит таблицы нечётной, чётной недели и объединённую.
+
+    Каждая ячейка форматируется один раз и переиспользуется во всех трёх таблицах.
+    """
+    odd_rows = []
+    even_rows = []
+    combined_rows = []
+    for day in DAYS_ORDER:
+        # Множества наполняются в том же порядке, что и раньше, чтобы совпал порядок пар с одинаковым номером
+        odd_slots = set()
+        even_slots = set()
+        combined_slots = set()
+        for teacher in teachers:
+            odd = odd_schedules.get(teacher)
+            if odd is not None and day in odd:
+                for slot in odd.slots(day):
+                    odd_slots.add(slot)
+                    combined_slots.add(slot)
+            even = even_schedules.get(teacher)
+            if even is not None and day in even:
+                for slot in even.slots(day):
+                    even_slots.add(slot)
+                    combined_slots.add(slot)
+        if not combined_slots:
+            continue
+
+        cells = {}
+        for slot in combined_slots:
+            cells[slot] = [(_cell(odd_schedules.get(teacher), day, slot, keep_groups),
+                            _cell(even_schedules.get(teacher), day, slot, keep_groups))
+                           for teacher in teachers]
+
+        for rows, slots, week in ((odd_rows, odd_slots, 0), (even_rows, even_slots, 1)):
+            day_added = False
+            for номер, время in _sorted_slots(slots):
+                row = [номер, время] + [pair[week] for pair in cells[(номер, время)]]
+                if any(cell != "" for cell in row[2:]):
+                    if not day_added:
+                        rows.append([day] + [""] * (len(teachers) + 1))
+                        day_added = True
+                    rows.append(row)
+
+        day_added = False
+        for номер, время in _sorted_slots(combined_slots):
+            row = [номер, время]
+            for pair in cells[(номер, время)]:
+                row.extend(pair)
+            if any(cell != "" for cell in row[2:]):
+                if not day_added:
+                    combined_rows.append([day] + [""] * (len(teachers) * 2 + 1))
+                    day_added = True
+                combined_rows.append(row)
+
+    columns = ["№", "Время"] + teachers
+    combined_columns = ["№", "Время"] + sum([[f"{teacher} (Нечётная)", f"{teacher} (Чётная)"] for teacher in teachers], [])
+    return (pd.DataFrame(odd_rows, columns=columns),
+            pd.DataFrame(even_rows, columns=columns),
+            pd.DataFrame(combined_rows, columns=combined_columns))
@@ -0,0 +1,52 @@
+import threading
+import time
+
+CANCELLED_MESSAGE = "Загрузка отменена"
+DEADLINE_MESSAGE = "Превышено время загрузки"
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Кооперативная отмена загрузки: кнопка "Остановить", новый запуск поверх старого
+    или общий срок deadline (секунды от создания токена).
+
+    Токен передаётся в create_combined_schedule / fetch_schedules и дальше в загрузку страниц:
+    ожидание результатов и паузы между повторами прерываются сразу после отмены.
+    """
+
+    def __init__(self, deadline=None):
+        self._event = threading.Event()
+        self.reason = None
+        self.deadline = time.monotonic() + deadline if deadline is not None else None
+
+    def cancel(self, reason=CANCELLED_MESSAGE):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE_MESSAGE)
+        return self._event.is_set()
+
+    def remaining(self):
+        # Секунды до срока или None, если срока нет
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def wait(self, seconds):
+        # Пауза, которую прерывает отмена; True - загрузку отменили
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._event.wait(seconds)
+        return self.cancelled
+
+    def check(self):
+        if self.cancelled:
+            raise LoadCancelled(self.reason)
@@ -0,0 +1,246 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+
+from logic.batch import BatchRunner
+from logic.cancel import CancelToken
+from logic.fetcher import DEFAULT_MAX_WORKERS
+from logic.main import MainLogic
+from logic.metrics import RunMetrics
+
+# Коды возврата
+EXIT_OK = 0
+EXIT_TEACHER_ERRORS = 1  # таблица сохранена, но часть расписаний не загрузилась
+EXIT_FAILED = 2  # конфигурация не прочитана или ни одно расписание не загрузилось
+
+
+def output_path_for(config_path, output, several_configs, export_format="xlsx"):
+    # Один конфиг и путь к файлу нужного формата - пишем прямо в него, иначе output - каталог
+    if not several_configs and output.lower().endswith("." + export_format):
+        return output
+    name = os.path.splitext(os.path.basename(config_path))[0] + "." + export_format
+    return os.path.join(output, name)
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается дата в формате ГГГГ-ММ-ДД: {value}")
+
+
+def build_config(logic, config_path, file_path, keep_groups=False, on_status=None, group_sheets=False,
+                 room_report=False, diff=False, deadline=None, offline=None, from_store=False, metrics=None):
+    """Загрузка конфига -> скачивание расписаний -> сохранение таблицы.
+    deadline - срок на скачивание в секундах: по его истечении таблица собирается из того, что успело загрузиться.
+    offline - каталог или архив сохранённых страниц вместо сайта (см. logic.offline).
+    from_store - расписания из последнего запуска этого конфига в базе SQLite (см. logic.store).
+    metrics - "json" или "csv": сохранить замеры рядом с таблицей (<имя>.metrics.json/csv), даже если сборка не удалась.
+    Возвращает отчёт по конфигу в виде словаря."""
+    report = {"config": config_path, "output": None, "teachers": [], "error": None, "cancelled": None}
+    cancel = CancelToken(deadline) if deadline is not None else None
+    try:
+        logic.load_config_file(config_path)
+
+        def callback(teacher_name, schedule):
+            if on_status:
+                on_status(teacher_name, logic.get_status_text(teacher_name, schedule))
+
+        if offline:
+            logic.load_offline(offline, callback=callback)
+        elif from_store:
+            logic.load_from_store(callback=callback)
+        else:
+            logic.create_combined_schedule(check_only=True, callback=callback, cancel=cancel)
+        if cancel is not None and cancel.cancelled:
+            report["cancelled"] = cancel.reason
+        # В отчёте - порядок конфигурации, а не порядок завершения загрузок
+        report["teachers"] = [{"name": teacher_name, "status": logic.get_status_text(teacher_name, schedule),
+                               "ok": isinstance(schedule, tuple)}
+                              for teacher_name, schedule in logic.teachers_schedule.items()]
+        logic.create_combined_schedule(save_file=True, keep_groups=keep_groups, file_path=file_path)
+        report["output"] = file_path
+        if group_sheets:
+            report["groups_output"] = os.path.splitext(file_path)[0] + ".groups.xlsx"
+            logic.save_group_schedule(report["groups_output"])
+        if room_report:
+            report["rooms_output"] = os.path.splitext(file_path)[0] + ".rooms.xlsx"
+            logic.save_room_report(report["rooms_output"])
+        if diff:
+            report["diff"] = write_diff(logic, os.path.splitext(file_path)[0])
+    except (ValueError, PermissionError, OSError) as e:
+        report["error"] = " ".join(map(str, e.args)) if e.args else str(e)
+    if metrics:
+        report["metrics"] = os.path.splitext(file_path)[0] + ".metrics." + metrics
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(report["metrics"])), exist_ok=True)
+            logic.metrics.save_report(report["metrics"])
+        except OSError as e:
+            report["metrics"] = None
+            report["error"] = report["error"] or f"Ошибка сохранения замеров: {e}"
+    report["ok"] = sum(1 for teacher in report["teachers"] if teacher["ok"])
+    report["failed"] = len(report["teachers"]) - report["ok"]
+    return report
+
+
+def write_diff(logic, base_path):
+    # Сравнение с предыдущим снимком этого конфига: <имя>.diff.json и <имя>.changes.xlsx
+    from logic.snapshots import save_diff
+    changes, previous = logic.diff_with_previous()
+    if changes is None:
+        return {"previous": None, "changes": 0}
+    json_path, xlsx_path = save_diff(base_path, changes, previous, logic.last_snapshot)
+    return {"previous": previous, "changes": len(changes), "json": json_path, "xlsx": xlsx_path}
+
+
+def exit_code(reports):
+    if any(report["error"] for report in reports):
+        return EXIT_FAILED
+    if any(report["failed"] for report in reports):
+        return EXIT_TEACHER_ERRORS
+    return EXIT_OK
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="run_cli.py",
+        description="Сборка объединённого расписания преподавателей СФУ без графического интерфейса.")
+    parser.add_argument("configs", nargs="*", help="файлы конфигурации (ФИО, ссылка на расписание)")
+    parser.add_argument("--batch", metavar="DIR",
+                        help="каталог с конфигами подразделений: собрать все параллельно в нескольких процессах")
+    parser.add_argument("-o", "--output", required=True,
+                        help="файл (для одного конфига) или каталог для таблиц")
+    parser.add_argument("--format", choices=["xlsx", "csv", "jsonl", "parquet", "ics"], default=None,
+                        help="формат выгрузки (по умолчанию - по расширению -o или xlsx); csv и parquet - "
+                             "файл на таблицу, ics - каталог календарей по преподавателям")
+    parser.add_argument("--semester-start", type=parse_date, help="понедельник первой (нечётной) недели, для ics")
+    parser.add_argument("--semester-end", type=parse_date, help="последний день семестра, для ics")
+    parser.add_argument("--keep-groups", action="store_true", help="оставить подгруппы в названиях групп")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="число одновременных запросов к сайту расписания")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать дисковый кэш страниц")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="число процессов для разбора страниц и записи таблиц в режиме --batch "
+                             "(по умолчанию - по числу ядер; 1 - разбирать страницы в потоках загрузки)")
+    parser.add_argument("--offline", metavar="PATH",
+                        help="собрать таблицу без сети - из каталога или архива zip/tar сохранённых страниц")
+    parser.add_argument("--save-pages", metavar="PATH",
+                        help="сохранить скачанные страницы в каталог или .zip для последующих запусков с --offline")
+    parser.add_argument("--from-store", action="store_true",
+                        help="собрать таблицу без сети - из последнего сохранённого в базе запуска этого конфига")
+    parser.add_argument("--no-store", action="store_true",
+                        help="не сохранять загруженные расписания в базу SQLite")
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в формате JSON")
+    parser.add_argument("--group-sheets", action="store_true",
+                        help="сохранить расписания групп, собранные по расписаниям преподавателей (<имя>.groups.xlsx)")
+    parser.add_argument("--room-report", action="store_true",
+                        help="сохранить загрузку аудиторий и двойные бронирования (<имя>.rooms.xlsx)")
+    parser.add_argument("--diff", action="store_true",
+                        help="сравнить с прошлым запуском этого конфига (<имя>.diff.json и <имя>.changes.xlsx)")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="общий срок на скачивание расписаний одного конфига; не успевшие загрузиться "
+                             "преподаватели попадают в отчёт с ошибкой")
+    parser.add_argument("--metrics", choices=["json", "csv"],
+                        help="сохранить замеры по этапам и преподавателям рядом с таблицей (<имя>.metrics.json/csv)")
+    args = parser.parse_args(argv)
+    if bool(args.configs) == bool(args.batch):
+        parser.error("укажите файлы конфигурации или каталог --batch")
+    if args.format is None:
+        ext = os.path.splitext(args.output)[1].lower().lstrip(".")
+        args.format = ext if ext in ("xlsx", "csv", "jsonl", "parquet", "ics") else "xlsx"
+    if args.batch and args.format != "xlsx":
+        parser.error("в режиме --batch таблицы сохраняются только в xlsx")
+    if args.batch and (args.metrics or args.group_sheets or args.room_report or args.diff
+                       or args.deadline is not None):
+        parser.error("--metrics, --group-sheets, --room-report, --diff и --deadline не поддерживаются в режиме --batch")
+    if args.batch and (args.offline or args.save_pages or args.from_store):
+        parser.error("--offline, --from-store и --save-pages не поддерживаются в режиме --batch")
+    if args.offline and (args.save_pages or args.deadline is not None):
+        parser.error("--offline нельзя сочетать с --save-pages и --deadline")
+    if args.from_store and (args.offline or args.save_pages or args.deadline is not None):
+        parser.error("--from-store нельзя сочетать с --offline, --save-pages и --deadline")
+    if args.processes is not None and args.processes < 1:
+        parser.error("--processes должен быть не меньше 1")
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline должен быть больше нуля")
+    return args
+
+
+def print_report(report):
+    if report.get("cancelled"):
+        print(f"  {report['cancelled']}: таблица собрана из уже загруженных расписаний")
+    if report["error"]:
+        print(f"  Ошибка: {report['error']}")
+    else:
+        print(f"  Сохранено: {report['output']} (успешно: {report['ok']}, с ошибками: {report['failed']})")
+    if report.get("diff"):
+        if report["diff"]["previous"] is None:
+            print("  Изменения: нет прошлого запуска для сравнения")
+        else:
+            print(f"  Изменений с прошлого запуска: {report['diff']['changes']} ({report['diff']['xlsx']})")
+
+
+def run_batch(args):
+    runner = BatchRunner(max_workers=args.workers, processes=args.processes, use_cache=not args.no_cache,
+                         keep_groups=args.keep_groups)
+    on_status = None
+    if not args.json:
+        on_status = lambda teacher_name, status: print(f"  {teacher_name}: {status}", flush=True)
+    try:
+        reports = runner.run(args.batch, args.output, callback=on_status)
+    finally:
+        runner.close()
+    if args.json:
+        print(json.dumps({"configs": reports}, ensure_ascii=False, indent=2))
+    else:
+        for report in reports:
+            print(f"== {report['config']}")
+            print_report(report)
+    return exit_code(reports)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.batch:
+        return run_batch(args)
+    several_configs = len(args.configs) > 1
+    if several_configs or not args.output.lower().endswith("." + args.format):
+        os.makedirs(args.output, exist_ok=True)
+    else:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    logic = MainLogic(max_workers=args.workers, use_cache=not args.no_cache,
+                      metrics=RunMetrics() if args.metrics else None)
+    logic.semester_start = args.semester_start
+    logic.semester_end = args.semester_end
+    logic.parse_processes = args.processes
+    logic.keep_store = not args.no_store
+    if args.save_pages:
+        from logic.offline import PageArchiveWriter
+        logic.page_archive = PageArchiveWriter(args.save_pages)
+    reports = []
+    try:
+        for config_path in args.configs:
+            file_path = output_path_for(config_path, args.output, several_configs, args.format)
+            on_status = None
+            if not args.json:
+                print(f"== {config_path}")
+                on_status = lambda teacher_name, status: print(f"  {teacher_name}: {status}", flush=True)
+            report = build_config(logic, config_path, file_path, keep_groups=args.keep_groups, on_status=on_status,
+                                  group_sheets=args.group_sheets, room_report=args.room_report,
+                                  diff=args.diff, deadline=args.deadline, offline=args.offline,
+                                  from_store=args.from_store, metrics=args.metrics)
+            reports.append(report)
+            if not args.json:
+                print_report(report)
+
+        if args.json:
+            print(json.dumps({"configs": reports}, ensure_ascii=False, indent=2))
+    finally:
+        # Пул процессов, база и архив страниц закрываются и после ошибки (индекс архива пишется в close)
+        if logic.page_archive is not None:
+            logic.page_archive.close()
+        logic.close()
+    return exit_code(reports)
@@ -0,0 +1,116 @@
+import csv
+import io
+import os
+from urllib.parse import urlsplit, urlunsplit
+
+CONFIG_EXTENSIONS = ('.xlsx', '.xls', '.xlsm', '.xlsb', '.csv')
+SITE_URL = "https://edu.sfu-kras.ru/timetable"
+MAX_REPORTED_ERRORS = 30
+
+FORMAT_ERROR = ("Файл конфигурации не представляет собой таблицу из двух колонок, где\n"
+                "В первой колонке - ФИО преподавателя,\n"
+                "во второй колонке - гиперссылка на преподавателя на сайте расписания СФУ.\n\n"
+                "Пожалуйста, проверьте файл конфигурации и после попробуйте загрузить ещё раз.")
+
+
+def _read_csv(file_path):
+    # Excel в русской локали сохраняет CSV в cp1251 и с ";" - определяем кодировку и разделитель
+    with open(file_path, "rb") as f:
+        data = f.read()
+    for encoding in ("utf-8-sig", "cp1251"):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("Не удалось определить кодировку CSV-файла (ожидается UTF-8 или Windows-1251)")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(io.StringIO(text, newline=""), dialect)
+
+
+def _read_workbook(file_path):
+    # Режим только для чтения: строки читаются потоком, модель книги целиком не строится
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _read_legacy_workbook(file_path):
+    # .xls и .xlsb openpyxl не читает - через pandas и доступный ему движок
+    import pandas as pd
+    df = pd.read_excel(file_path, header=None, dtype=object)
+    for row in df.itertuples(index=False, name=None):
+        yield tuple(None if pd.isna(value) else value for value in row)
+
+
+def iter_config_rows(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in CONFIG_EXTENSIONS:
+        raise ValueError("Недопустимый формат файла")
+    if ext == '.csv':
+        return _read_csv(file_path)
+    if ext in ('.xlsx', '.xlsm'):
+        return _read_workbook(file_path)
+    return _read_legacy_workbook(file_path)
+
+
+def normalize_name(value):
+    # Лишние и неразрывные пробелы в ФИО ломают сравнение имён и поиск на странице
+    return " ".join(str(value).split()) if value is not None else ""
+
+
+def normalize_url(value):
+    if value is None:
+        return ""
+    url = str(value).strip()
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ""))
+
+
+def load_config(file_path):
+    """Читает конфиг (ФИО, ссылка) потоком и возвращает список {"фио", "url"} без повторов.
+
+    Одинаковые строки схлопываются, несколько ФИО могут ссылаться на одну страницу.
+    Все ошибочные строки собираются и сообщаются одним ValueError.
+    """
+    teachers = []
+    urls_by_name = {}
+    errors = []
+    for row_number, row in enumerate(iter_config_rows(file_path), 1):
+        values = [value for value in row if value is not None and str(value).strip()]
+        if not values:
+            continue
+        if any(value is not None and str(value).strip() for value in row[2:]):
+            raise ValueError(FORMAT_ERROR)
+        name = normalize_name(row[0])
+        url = normalize_url(row[1]) if len(row) > 1 else ""
+        if not name:
+            errors.append(f"Строка {row_number}: не указано ФИО преподавателя (ссылка: {url})")
+        elif SITE_URL not in url:
+            errors.append(f"Строка {row_number}: для преподавателя {name} введена неверная ссылка: {url or 'пусто'}")
+        elif name in urls_by_name:
+            if urls_by_name[name] != url:
+                errors.append(f"Строка {row_number}: преподаватель {name} уже указан с другой ссылкой: {urls_by_name[name]}")
+        else:
+            urls_by_name[name] = url
+            teachers.append({"фио": name, "url": url})
+
+    if errors:
+        shown = errors[:MAX_REPORTED_ERRORS]
+        if len(errors) > len(shown):
+            shown.append(f"... и ещё {len(errors) - len(shown)}")
+        raise ValueError(f"В файле конфигурации ошибочных строк: {len(errors)}\n" + "\n".join(shown) +
+                         "\n\nУбедитесь, что ссылки ведут на сайт расписания СФУ.")
+    if not teachers:
+        raise ValueError(FORMAT_ERROR)
+    return teachers
@@ -0,0 +1,190 @@
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+from logic.builder import DAYS_ORDER
+from logic.metrics import NULL_METRICS
+
+WEEK_SHEETS = ["1 нед", "2 нед"]
+COMBINED_SHEET = "Объединённое расписание"
+NUMBER_WIDTH = 74 / 7.5
+TIME_WIDTH = 100 / 7.5
+
+
+def _schedule_styles():
+    # Все оформления создаются один раз на книгу, ячейкам назначаются по имени
+    header_fill = PatternFill(start_color="5f8a96", end_color="5f8a96", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    day_fill = PatternFill(start_color="ff6600", end_color="ff6600", fill_type="solid")
+    subject_fill = PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")
+    discipline_font = Font(color="5f8a96", bold=True)
+    default_font = Font(color="000000")
+    medium_border = Border(left=Side(style='medium', color='cccccc'),
+                           right=Side(style='medium', color='cccccc'),
+                           top=Side(style='medium', color='cccccc'),
+                           bottom=Side(style='medium', color='cccccc'))
+    day_alignment = Alignment(horizontal="left", vertical="center", indent=1, wrap_text=True)
+    cell_alignment = Alignment(horizontal="left", vertical="top", indent=1, wrap_text=True)
+    # На листах недель выравнивание по центру с отступом, на объединённом - без
+    week_center = Alignment(horizontal="center", vertical="center", indent=1, wrap_text=True)
+    combined_center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    return [
+        NamedStyle("sfu_week_header", font=header_font, fill=header_fill, border=medium_border, alignment=week_center),
+        NamedStyle("sfu_combined_header", font=header_font, fill=header_fill, border=medium_border, alignment=combined_center),
+        NamedStyle("sfu_week_teacher", font=Font(color="5f8a96", bold=True), fill=subject_fill,
+                   border=medium_border, alignment=cell_alignment),
+        NamedStyle("sfu_combined_teacher", font=Font(color="5f8a96", bold=True, underline="single"), fill=subject_fill,
+                   border=medium_border, alignment=combined_center),
+        NamedStyle("sfu_day", font=Font(bold=True, color="FFFFFF"), fill=day_fill,
+                   border=Border(bottom=Side(style='thick', color='5f8a96')), alignment=day_alignment),
+        NamedStyle("sfu_week_number", font=default_font, border=medium_border, alignment=week_center),
+        NamedStyle("sfu_combined_number", font=default_font, border=medium_border, alignment=combined_center),
+        NamedStyle("sfu_subject_empty", font=DEFAULT_FONT, fill=subject_fill, border=medium_border, alignment=cell_alignment),
+        NamedStyle("sfu_subject", font=default_font, fill=subject_fill, border=medium_border, alignment=cell_alignment),
+        NamedStyle("sfu_discipline", font=discipline_font, fill=subject_fill, border=medium_border, alignment=cell_alignment),
+    ]
+
+
+class ScheduleWorkbookWriter:
+    """Потоковая запись книги расписания (openpyxl write-only).
+
+    Оформление назначается ячейкам в момент записи строки, а ширины столбцов
+    считаются в том же проходе по данным, поэтому лист не перечитывается после записи.
+    """
+
+    def __init__(self, teacher_urls=None):
+        self.teacher_urls = teacher_urls or {}
+        self.workbook = Workbook(write_only=True)
+        for style in _schedule_styles():
+            self.workbook.add_named_style(style)
+
+    def _cell(self, worksheet, value=None, style=None):
+        cell = WriteOnlyCell(worksheet, value=value)
+        if style is not None:
+            cell.style = style
+        return cell
+
+    def _data_rows(self, worksheet, df, start_row, number_style, widths):
+        # Строки данных: строка дня объединяется на всю ширину, остальные - номер, время и занятия
+        rows = []
+        merges = []
+        max_column = len(df.columns)
+        for row_idx, values in enumerate(df.itertuples(index=False, name=None), start_row):
+            if values[0] in DAYS_ORDER:
+                rows.append([self._cell(worksheet, values[0], "sfu_day")] +
+                            [self._cell(worksheet, None, "sfu_day") for _ in range(max_column - 1)])
+                merges.append(f"A{row_idx}:{get_column_letter(max_column)}{row_idx}")
+                continue
+            row = [self._cell(worksheet, values[0], number_style), self._cell(worksheet, values[1], number_style)]
+            for col, value in enumerate(values[2:], 2):
+                if value:
+                    lines = str(value).split('\n')
+                    widths[col] = max(widths[col], max(len(line) for line in lines))
+                    style = "sfu_discipline" if len(lines) >= 2 else "sfu_subject"
+                else:
+                    style = "sfu_subject_empty"
+                row.append(self._cell(worksheet, value, style))
+            rows.append(row)
+        return rows, merges
+
+    def _set_widths(self, worksheet, widths):
+        worksheet.column_dimensions['A'].width = NUMBER_WIDTH
+        worksheet.column_dimensions['B'].width = TIME_WIDTH
+        for col in range(2, len(widths)):
+            worksheet.column_dimensions[get_column_letter(col + 1)].width = widths[col] + 2 if widths[col] > 0 else 10
+
+    def write_week_sheet(self, title, df):
+        worksheet = self.workbook.create_sheet(title)
+        widths = [0] * len(df.columns)
+        rows, merges = self._data_rows(worksheet, df, 2, "sfu_week_number", widths)
+
+        header = [self._cell(worksheet, df.columns[0], "sfu_week_header"),
+                  self._cell(worksheet, df.columns[1], "sfu_week_header")]
+        for teacher in df.columns[2:]:
+            url = self.teacher_urls.get(teacher)
+            if url:
+                cell = self._cell(worksheet, teacher, "Hyperlink")
+                cell.hyperlink = url
+            else:
+                cell = self._cell(worksheet, teacher, "sfu_week_teacher")
+            header.append(cell)
+
+        self._set_widths(worksheet, widths)
+        for merge in merges:
+            worksheet.merged_cells.add(merge)
+        worksheet.append(header)
+        for row in rows:
+            worksheet.append(row)
+
+    def write_combined_sheet(self, df):
+        worksheet = self.workbook.create_sheet(COMBINED_SHEET)
+        # Столбцы "ФИО (Нечётная)", "ФИО (Чётная)" по каждому преподавателю, см. logic.builder.build_tables
+        teachers = [str(column).rsplit(" (", 1)[0] for column in df.columns[2::2]]
+        # Ширина учитывает и подписи "ФИО (Нечётная)"/"ФИО (Чётная)" из заголовка таблицы
+        widths = [len(max(str(column).split('\n'), key=len)) for column in df.columns]
+        rows, merges = self._data_rows(worksheet, df, 3, "sfu_combined_number", widths)
+
+        teacher_row = ["", ""]
+        for teacher in teachers:
+            cell = self._cell(worksheet, teacher, "sfu_combined_teacher")
+            url = self.teacher_urls.get(teacher)
+            if url:
+                cell.hyperlink = url
+            teacher_row.extend([cell, None])
+        for teacher_idx in range(len(teachers)):
+            col_start = 3 + teacher_idx * 2
+            worksheet.merged_cells.add(f"{get_column_letter(col_start)}1:{get_column_letter(col_start + 1)}1")
+
+        header_row = []
+        for col in range(1, len(df.columns) + 1):
+            if col == 1:
+                value = "№"
+            elif col == 2:
+                value = "Время"
+            elif col % 2 == 1:
+                value = "Нечётная неделя"
+            else:
+                value = "Чётная неделя"
+            header_row.append(self._cell(worksheet, value, "sfu_combined_header"))
+
+        self._set_widths(worksheet, widths)
+        worksheet.row_dimensions[2].height = 15.75
+        for merge in merges:
+            worksheet.merged_cells.add(merge)
+        worksheet.append(teacher_row)
+        worksheet.append(header_row)
+        for row in rows:
+            worksheet.append(row)
+
+    def write_table_sheet(self, title, columns, rows):
+        # Простая таблица (отчёты): заголовок в стиле листов недель, ширина по содержимому
+        worksheet = self.workbook.create_sheet(title)
+        widths = [len(str(column)) for column in columns]
+        cells = []
+        for values in rows:
+            row = []
+            for col, value in enumerate(values):
+                if value is not None and value != "":
+                    widths[col] = max(widths[col], max(len(line) for line in str(value).split('\n')))
+                row.append(self._cell(worksheet, value, "sfu_subject"))
+            cells.append(row)
+        for col, width in enumerate(widths):
+            worksheet.column_dimensions[get_column_letter(col + 1)].width = min(width + 2, 80)
+        worksheet.append([self._cell(worksheet, column, "sfu_week_header") for column in columns])
+        for row in cells:
+            worksheet.append(row)
+
+    def save(self, file_path):
+        self.workbook.save(file_path)
+
+
+def save_schedule_workbook(file_path, odd_df, even_df, combined_df, teacher_urls=None, metrics=NULL_METRICS):
+    with metrics.timer("formatting"):
+        writer = ScheduleWorkbookWriter(teacher_urls)
+        writer.write_week_sheet(WEEK_SHEETS[0], odd_df)
+        writer.write_week_sheet(WEEK_SHEETS[1], even_df)
+        writer.write_combined_sheet(combined_df)
+    with metrics.timer("save"):
+        writer.save(file_path)
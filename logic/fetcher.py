@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from logic.cancel import LoadCancelled
+
+DEFAULT_MAX_WORKERS = 8
+CANCEL_POLL_SECONDS = 0.1  # как часто ожидание результатов проверяет отмену
+
+
+def fetch_concurrently(jobs, worker, max_workers=DEFAULT_MAX_WORKERS, callback=None, cancel=None):
+    """Выполняет worker(*args) для каждой задачи из jobs = [(key, args), ...]
+    не более чем в max_workers потоков одновременно.
+
+    callback(key, result) вызывается в вызывающем потоке по мере готовности
+    результатов, а возвращаемый словарь упорядочен так же, как jobs.
+    cancel - CancelToken (logic.cancel): после отмены функция сразу возвращается,
+    не дожидаясь запущенных задач, и в словаре остаются только готовые ключи.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return {}
+    results = {}
+    max_workers = max(1, min(max_workers, len(jobs)))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = ()
+    try:
+        futures = {executor.submit(worker, *args): key for key, args in jobs}
+        pending = set(futures)
+        while pending:
+            if cancel is not None and cancel.cancelled:
+                break
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS if cancel is not None else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures[future]
+                try:
+                    result = future.result()
+                except LoadCancelled:
+                    continue  # задачу прервала отмена - результата нет
+                except Exception as e:
+                    # Ошибка одного преподавателя не должна обрывать загрузку остальных
+                    result = f"Ошибка загрузки: {e}"
+                results[key] = result
+                if callback:
+                    callback(key, result)
+    finally:
+        # При отмене ещё не начатые задачи снимаются, а запущенные дорабатывают в фоне без ожидания
+        executor.shutdown(wait=not pending, cancel_futures=True)
+    return {key: results[key] for key, _ in jobs if key in results}
@@ -0,0 +1,202 @@
+import csv
+import datetime
+import hashlib
+import json
+import os
+import re
+
+from logic.builder import DAYS_ORDER
+from logic.groups import split_lesson
+from logic.parser import extract_room
+from logic.slots import WEEKS
+
+# Формат определяется по расширению файла; xlsx пишет logic.export (оформленная книга)
+EXPORT_FORMATS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".parquet": "parquet",
+    ".ics": "ics",
+}
+TABLE_NAMES = ["odd", "even", "combined"]
+PARQUET_BATCH_ROWS = 1000
+TIMEZONE = "Asia/Krasnoyarsk"
+UTC_OFFSET = datetime.timedelta(hours=7)  # Красноярск, без перехода на летнее время
+TIME_RANGE = re.compile(r'(\d{1,2}):(\d{2})\s*[-–]\s*(\d{1,2}):(\d{2})')
+
+
+def format_for_path(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {ext or file_path}. "
+                         f"Доступны: {', '.join(sorted(EXPORT_FORMATS))}")
+    return EXPORT_FORMATS[ext]
+
+
+def available_formats():
+    formats = ["xlsx", "csv", "jsonl", "ics"]
+    try:
+        import pyarrow  # noqa: F401 - необязательная зависимость
+        formats.append("parquet")
+    except ImportError:
+        pass
+    return formats
+
+
+def table_paths(file_path):
+    # Для CSV и Parquet у каждой таблицы своя схема - по файлу на таблицу рядом с file_path
+    base, ext = os.path.splitext(file_path)
+    return [f"{base}.{name}{ext}" for name in TABLE_NAMES]
+
+
+def iter_records(df):
+    """Строки таблицы без строк-заголовков дней: (день, номер, время, ячейки...)."""
+    day = None
+    for values in df.itertuples(index=False, name=None):
+        if values[0] in DAYS_ORDER and not any(values[1:]):
+            day = values[0]
+            continue
+        yield (day,) + values
+
+
+def write_csv(file_path, tables):
+    for path, df in zip(table_paths(file_path), tables):
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(["День"] + list(df.columns))
+            for record in iter_records(df):
+                writer.writerow(record)
+
+
+def write_jsonl(file_path, tables):
+    # Одна строка - один слот одной таблицы: {"table", "День", "№", "Время", <колонки преподавателей>}
+    with open(file_path, "w", encoding="utf-8") as f:
+        for name, df in zip(TABLE_NAMES, tables):
+            columns = ["День"] + list(df.columns)
+            for record in iter_records(df):
+                f.write(json.dumps({"table": name, **dict(zip(columns, record))}, ensure_ascii=False))
+                f.write("\n")
+
+
+def write_parquet(file_path, tables):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Для выгрузки в Parquet установите пакет pyarrow")
+    for path, df in zip(table_paths(file_path), tables):
+        columns = ["День"] + [str(column) for column in df.columns]
+        schema = pa.schema([(column, pa.string()) for column in columns])
+        with pq.ParquetWriter(path, schema) as writer:
+            batch = []
+            for record in iter_records(df):
+                batch.append(record)
+                if len(batch) >= PARQUET_BATCH_ROWS:
+                    writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in batch], schema=schema))
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in batch], schema=schema))
+
+
+def default_semester(today=None):
+    # Осенний семестр - с понедельника недели 1 сентября по 31 декабря, весенний - с 9 февраля по 30 июня
+    today = today or datetime.date.today()
+    if today.month >= 8:
+        start, end = datetime.date(today.year, 9, 1), datetime.date(today.year, 12, 31)
+    else:
+        start, end = datetime.date(today.year, 2, 9), datetime.date(today.year, 6, 30)
+    return start - datetime.timedelta(days=start.weekday()), end
+
+
+def _ics_escape(text):
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r", "").replace("\n", "\\n"))
+
+
+def _ics_line(line):
+    # Строки длиннее 75 байт переносятся с пробелом в начале продолжения (RFC 5545)
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    for char in line:
+        limit = 75 if not parts else 74
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = char
+        else:
+            current += char
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def iter_teacher_events(schedule):
+    """(неделя, день, занятие, интервал): занятие в одном и том же слоте обеих недель -
+    еженедельное (интервал 1), иначе раз в две недели со своей чётностью."""
+    odd, even = schedule
+    for week_idx, week in enumerate(schedule):
+        other = even if week_idx == 0 else odd
+        for day, lessons in week.items():
+            if day not in DAYS_ORDER:
+                continue
+            for lesson in lessons:
+                if not lesson.text.strip():
+                    continue
+                same = other.lesson_at(day, lesson.number, lesson.time) if day in other else None
+                if same is not None and same.text == lesson.text:
+                    if week_idx == 0:
+                        yield WEEKS[week_idx], day, lesson, 1
+                    continue
+                yield WEEKS[week_idx], day, lesson, 2
+
+
+def write_teacher_calendar(f, teacher_name, schedule, semester_start, semester_end):
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    until = (datetime.datetime.combine(semester_end, datetime.time(23, 59, 59)) - UTC_OFFSET).strftime("%Y%m%dT%H%M%SZ")
+    for line in ("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//SFU TimeTable Builder//RU", "CALSCALE:GREGORIAN",
+                 f"X-WR-CALNAME:{_ics_escape(teacher_name)}", "BEGIN:VTIMEZONE", f"TZID:{TIMEZONE}",
+                 "BEGIN:STANDARD", "DTSTART:19700101T000000", "TZOFFSETFROM:+0700", "TZOFFSETTO:+0700",
+                 "END:STANDARD", "END:VTIMEZONE"):
+        f.write(_ics_line(line))
+    for week, day, lesson, interval in iter_teacher_events(schedule):
+        match = TIME_RANGE.search(lesson.time)
+        if not match:
+            continue
+        date = semester_start + datetime.timedelta(days=WEEKS.index(week) * 7 + DAYS_ORDER.index(day))
+        start = datetime.datetime.combine(date, datetime.time(int(match.group(1)), int(match.group(2))))
+        end = datetime.datetime.combine(date, datetime.time(int(match.group(3)), int(match.group(4))))
+        groups, details = split_lesson(lesson.text)
+        summary = details.split("\n")[0] or lesson.text.split("\n")[0]
+        if groups:
+            summary += " - " + ", ".join(group for group, subgroup in groups)
+        uid = hashlib.sha1(f"{teacher_name}|{week}|{day}|{lesson.number}|{lesson.text}".encode("utf-8")).hexdigest()
+        event = ["BEGIN:VEVENT", f"UID:{uid}@sfu-timetable", f"DTSTAMP:{stamp}",
+                 f"DTSTART;TZID={TIMEZONE}:{start:%Y%m%dT%H%M%S}", f"DTEND;TZID={TIMEZONE}:{end:%Y%m%dT%H%M%S}",
+                 f"RRULE:FREQ=WEEKLY;INTERVAL={interval};UNTIL={until}",
+                 f"SUMMARY:{_ics_escape(summary)}", f"DESCRIPTION:{_ics_escape(lesson.text)}"]
+        room = extract_room(lesson.text)
+        if room:
+            event.append(f"LOCATION:{_ics_escape(room)}")
+        event.append("END:VEVENT")
+        for line in event:
+            f.write(_ics_line(line))
+    f.write(_ics_line("END:VCALENDAR"))
+
+
+def write_ics(file_path, teachers_schedule, semester_start=None, semester_end=None):
+    """Календари по преподавателям: каталог <file_path без .ics>/<ФИО>.ics.
+    semester_start - понедельник первой (нечётной) недели семестра."""
+    default_start, default_end = default_semester()
+    semester_start = semester_start or default_start
+    semester_start -= datetime.timedelta(days=semester_start.weekday())
+    semester_end = semester_end or default_end
+    directory = os.path.splitext(file_path)[0]
+    os.makedirs(directory, exist_ok=True)
+    for teacher_name, schedule in teachers_schedule.items():
+        if not isinstance(schedule, tuple):
+            continue
+        safe_name = re.sub(r'[<>:"/\\|?*]', "_", teacher_name)
+        with open(os.path.join(directory, safe_name + ".ics"), "w", encoding="utf-8", newline="") as f:
+            write_teacher_calendar(f, teacher_name, schedule, semester_start, semester_end)
+    return directory
@@ -0,0 +1,118 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from logic.builder import DAYS_ORDER, SUBGROUP_PATTERN
+from logic.slots import WEEKS
+
+GROUP_COLUMNS = ["№", "Время", "Нечётная неделя", "Чётная неделя"]
+# Шифр группы - одно "слово" с цифрами: КИ21-01Б, ВЦ23-01М, КИ22-16/1Б
+GROUP_NAME_PATTERN = re.compile(r"[^\s:]*\d[^\s:]*")
+SHEET_TITLE_FORBIDDEN = str.maketrans({char: "-" for char in "[]:*?/\\"})
+
+
+class GroupLesson(namedtuple("GroupLesson", ["day", "number", "time", "week", "teacher", "subgroup", "details"])):
+    # details - строки занятия после списка групп: дисциплина, аудитория и т.д.
+    __slots__ = ()
+
+
+@lru_cache(maxsize=65536)
+def split_lesson(text):
+    # "ВЦ23-01М, КИ22-16/1Б (1 подгруппа)\nФизика\nауд." -> ((группа, подгруппа), ...), "Физика\nауд."
+    # Если в ячейке не было групп, первая строка - уже дисциплина или "ЭИОС, ссылка": групп нет
+    first_line, _, details = text.partition("\n")
+    groups = []
+    for group_text in first_line.split(", "):
+        match = SUBGROUP_PATTERN.search(group_text)
+        group = SUBGROUP_PATTERN.sub("", group_text).strip()
+        if not GROUP_NAME_PATTERN.fullmatch(group):
+            return (), text
+        groups.append((group, match.group(1) if match else ""))
+    return tuple(groups), details
+
+
+def _number_key(number):
+    try:
+        return int(number), ""
+    except ValueError:
+        return 0, number
+
+
+class GroupIndex:
+    """Обратный индекс группа -> занятия, собранный по уже загруженным расписаниям преподавателей.
+
+    Расписание группы получается без отдельного обхода страниц групп на сайте СФУ.
+    """
+
+    def __init__(self, teachers_schedule):
+        self.entries = {}
+        for teacher, schedule in teachers_schedule.items():
+            if not isinstance(schedule, tuple):
+                continue
+            for week_idx, week in enumerate(schedule):
+                for day, lessons in week.items():
+                    for lesson in lessons:
+                        if not lesson.text.strip():
+                            continue
+                        groups, details = split_lesson(lesson.text)
+                        for group, subgroup in groups:
+                            self.entries.setdefault(group, []).append(GroupLesson(
+                                day, lesson.number, lesson.time, WEEKS[week_idx], teacher, subgroup, details))
+        day_positions = {day: i for i, day in enumerate(DAYS_ORDER)}
+        for lessons in self.entries.values():
+            lessons.sort(key=lambda l: (day_positions.get(l.day, len(DAYS_ORDER)), _number_key(l.number),
+                                        WEEKS.index(l.week)))
+
+    def groups(self):
+        return sorted(self.entries)
+
+    def lessons(self, group, week=None, day=None):
+        # Занятия группы, при необходимости только за неделю ("Нечётная"/"Чётная") и/или день
+        return [lesson for lesson in self.entries.get(group, [])
+                if (week is None or lesson.week == week) and (day is None or lesson.day == day)]
+
+    def table_rows(self, group):
+        # Строки в формате листов недель: строка дня, затем [номер, время, нечётная, чётная]
+        rows = []
+        cells = {}
+        for lesson in self.entries.get(group, []):
+            slot = cells.setdefault((lesson.day, lesson.number, lesson.time), {})
+            text = lesson.details + "\n" + lesson.teacher
+            if lesson.subgroup:
+                text = f"({lesson.subgroup})\n{text}"
+            slot.setdefault(lesson.week, []).append(text)
+        current_day = None
+        for (day, number, time), weeks in cells.items():
+            if day != current_day:
+                rows.append([day] + [""] * (len(GROUP_COLUMNS) - 1))
+                current_day = day
+            rows.append([number, time] + ["\n\n".join(weeks.get(week, [])) for week in WEEKS])
+        return rows
+
+
+def sheet_title(name, used):
+    # Имя листа Excel: до 31 символа, без []:*?/\ и без повторов
+    base = name.translate(SHEET_TITLE_FORBIDDEN)[:31] or "Группа"
+    title = base
+    counter = 2
+    while title.lower() in used:
+        suffix = f" ({counter})"
+        title = base[:31 - len(suffix)] + suffix
+        counter += 1
+    used.add(title.lower())
+    return title
+
+
+def save_group_workbook(file_path, index, groups=None):
+    """Книга с отдельным листом на каждую группу (по умолчанию - на все группы индекса)."""
+    import pandas as pd
+    from logic.export import ScheduleWorkbookWriter
+    groups = groups or index.groups()
+    if not groups:
+        raise ValueError("Нет групп", "В загруженных расписаниях не найдено ни одной группы.")
+    writer = ScheduleWorkbookWriter()
+    used = set()
+    for group in groups:
+        df = pd.DataFrame(index.table_rows(group), columns=GROUP_COLUMNS)
+        writer.write_week_sheet(sheet_title(group, used), df)
+    writer.save(file_path)
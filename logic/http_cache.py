@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Каталог для всех кэшей приложения (в домашней папке, т.к. сборка PyInstaller распаковывается во временный каталог)
+CACHE_ROOT = os.path.join(os.path.expanduser("~"), ".sfu_timetable_builder")
+
+
+class HttpCache:
+    """Дисковый кэш ответов сайта расписания по URL.
+
+    Хранит тело страницы и заголовки ETag/Last-Modified. Пока запись моложе ttl,
+    она отдаётся без обращения к сети, после - перепроверяется условным GET.
+    Вытеснение - по давности последнего использования (LRU), общему размеру и возрасту.
+    Индекс меняется в памяти и записывается на диск в flush() (в конце загрузки), а не на каждую страницу.
+    """
+
+    def __init__(self, directory=None, ttl=3600, max_size=100 * 1024 * 1024, max_age=60 * 24 * 3600):
+        self.directory = directory or os.path.join(CACHE_ROOT, "http")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.index = self._load_index()
+        self.total_size = sum(meta["size"] for meta in self.index.values())
+        self.dirty = False
+
+    def _load_index(self):
+        # Порядок записей в индексе - от давно использованных к недавним, вытеснение идёт с начала
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return dict(sorted(index.items(), key=lambda item: item[1]["last_used"]))
+
+    def _save_index(self):
+        self.dirty = False
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def _body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".body")
+
+    def get(self, url):
+        # Возвращает (text, meta) или None, если страницы нет в кэше
+        with self.lock:
+            meta = self.index.get(url)
+            if meta is None:
+                return None
+            try:
+                with open(self._body_path(url), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._remove(url)
+                return None
+            meta["last_used"] = time.time()
+            self.index[url] = self.index.pop(url)
+            self.dirty = True
+            return body.decode(meta["encoding"], errors="replace"), dict(meta)
+
+    def is_fresh(self, meta):
+        return time.time() - meta["stored_at"] < self.ttl
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def put(self, url, response):
+        body = response.content
+        now = time.time()
+        with self.lock:
+            with open(self._body_path(url), "wb") as f:
+                f.write(body)
+            if url in self.index:
+                self.total_size -= self.index.pop(url)["size"]
+            self.index[url] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "encoding": response.encoding or response.apparent_encoding or "utf-8",
+                "size": len(body),
+                "stored_at": now,
+                "last_used": now,
+            }
+            self.total_size += len(body)
+            self.dirty = True
+            if self.total_size > self.max_size:
+                self._evict_by_size()
+
+    def revalidated(self, url):
+        # Сервер ответил 304 - страница не изменилась, продлеваем срок жизни записи
+        with self.lock:
+            meta = self.index.get(url)
+            if meta is not None:
+                meta["stored_at"] = meta["last_used"] = time.time()
+                self.index[url] = self.index.pop(url)
+                self.dirty = True
+
+    def _evict_by_size(self):
+        while self.index and self.total_size > self.max_size:
+            self._remove(next(iter(self.index)))
+
+    def _evict_by_age(self):
+        now = time.time()
+        for url in [url for url, meta in self.index.items() if now - meta["last_used"] > self.max_age]:
+            self._remove(url)
+
+    def _remove(self, url):
+        self.total_size -= self.index.pop(url)["size"]
+        self.dirty = True
+        try:
+            os.remove(self._body_path(url))
+        except OSError:
+            pass
+
+    def flush(self):
+        # Раз за загрузку: заодно убираются записи старше max_age
+        with self.lock:
+            self._evict_by_age()
+            if self.dirty:
+                self._save_index()
+
+    def clear(self):
+        with self.lock:
+            for url in list(self.index):
+                self._remove(url)
+            self._save_index()
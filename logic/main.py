@@ -1,16 +1,114 @@
+import functools
+import importlib
 import os
-import re
-import pandas as pd
-from tkinter import messagebox, filedialog
-import requests
-from bs4 import BeautifulSoup, NavigableString, Tag
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+import threading
+import time
+from logic.fetcher import fetch_concurrently, DEFAULT_MAX_WORKERS
+from logic.http_cache import HttpCache
+from logic.metrics import NULL_METRICS
+
+# pandas, openpyxl, bs4 и requests импортируются при первом использовании (загрузка конфига,
+# скачивание, сохранение), чтобы главное окно появлялось сразу. prewarm_imports() подгружает их заранее.
+HEAVY_MODULES = ["requests", "bs4", "pandas", "openpyxl",
+                 "logic.transport", "logic.parser", "logic.parse_cache", "logic.pipeline", "logic.builder",
+                 "logic.export"]
+
+
+PIPELINE_MIN_PAGES = 16
+
+
+def prewarm_imports():
+    for module_name in HEAVY_MODULES:
+        importlib.import_module(module_name)
+
 
 class MainLogic:
-    def __init__(self):
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, transport=None, use_cache=True, metrics=None):
         self.teachers = []
         self.teachers_schedule = dict()
+        self.max_workers = max_workers  # максимальное число одновременных запросов к сайту СФУ
+        self._transport = transport
+        self._parse_cache = None
+        self._snapshot_store = None
+        self._schedule_store = None
+        self._parse_pool = None
+        self._lazy_lock = threading.Lock()
+        # Одновременно идёт одна загрузка: новая ждёт, пока отменённая предыдущая вернёт управление
+        self._load_lock = threading.RLock()
+        self.use_cache = use_cache  # False - всегда скачивать страницы заново, минуя дисковый кэш
+        self.parser_backend = None  # None - logic.parser.DEFAULT_BACKEND, см. logic.parser.PARSER_BACKENDS
+        # Разбор страниц в пуле процессов параллельно со скачиванием (см. logic.pipeline), если страниц
+        # не меньше PIPELINE_MIN_PAGES: None - процессов по числу ядер, 0 или 1 - разбор в потоках загрузки
+        self.parse_processes = None
+        # Границы семестра для календарей .ics (None - текущий семестр, см. logic.formats.default_semester)
+        self.semester_start = None
+        self.semester_end = None
+        self.fetch_attempts = dict()  # исходы попыток загрузки по каждому преподавателю
+        self.fetched_at = dict()  # время (time.time()) получения расписания каждого преподавателя
+        self.metrics = metrics or NULL_METRICS  # замеры по этапам, см. logic.metrics.RunMetrics
+        self.config_path = None
+        self.keep_snapshots = True  # сохранять снимок расписаний после каждой загрузки, см. logic.snapshots
+        self.last_snapshot = None
+        self.keep_store = True  # сохранять каждую загрузку в базу SQLite, см. logic.store
+        self.last_run_id = None
+        self.page_archive = None  # logic.offline.PageArchiveWriter: скачанные страницы дописываются в архив
+
+    @property
+    def transport(self):
+        # Создаётся при первом обращении: вместе с ним импортируется requests
+        with self._lazy_lock:
+            if self._transport is None:
+                from logic.transport import HttpTransport
+                self._transport = HttpTransport(pool_size=self.max_workers, cache=HttpCache())
+            return self._transport
+
+    @property
+    def parse_cache(self):
+        with self._lazy_lock:
+            if self._parse_cache is None:
+                from logic.parse_cache import ParseCache
+                self._parse_cache = ParseCache()
+            return self._parse_cache
+
+    @property
+    def snapshot_store(self):
+        with self._lazy_lock:
+            if self._snapshot_store is None:
+                from logic.snapshots import SnapshotStore
+                self._snapshot_store = SnapshotStore()
+            return self._snapshot_store
+
+    @property
+    def schedule_store(self):
+        with self._lazy_lock:
+            if self._schedule_store is None:
+                from logic.store import ScheduleStore
+                self._schedule_store = ScheduleStore()
+            return self._schedule_store
+
+    @property
+    def parse_pool(self):
+        # Пул живёт между загрузками: процессы запускаются один раз
+        with self._lazy_lock:
+            if self._parse_pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_processes or None)
+            return self._parse_pool
+
+    def use_parse_pool(self, page_count):
+        # Ради нескольких страниц запускать процессы дольше, чем разобрать их на месте
+        processes = self.parse_processes if self.parse_processes is not None else os.cpu_count() or 1
+        return processes > 1 and page_count >= PIPELINE_MIN_PAGES
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(cancel_futures=True)
+            self._parse_pool = None
+        if self._schedule_store is not None:
+            self._schedule_store.close()
+            self._schedule_store = None
 
     def get_teacher_statuses(self):
         statuses = dict()
@@ -21,40 +119,41 @@ class MainLogic:
                 statuses[teacher_name] = self.teachers_schedule[teacher_name]
         return statuses
 
-    def load_config_file(self, file_path):
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext not in ['.xlsx', '.xls', '.xlsm', '.xlsb', '.csv']:
-            raise ValueError("Недопустимый формат файла")
-
-        if ext == '.csv':
-            df = pd.read_csv(file_path, header=None)
-        else:
-            df = pd.read_excel(file_path, engine='openpyxl', header=None, names=["фио", "url"])
-
-        if df.shape[1] != 2:
-            raise ValueError("Файл конфигурации не представляет собой таблицу из двух колонок, где\n"
-                             "В первой колонке - ФИО преподавателя,\n"
-                             "во второй колонке - гиперссылка на преподавателя на сайте расписания СФУ.\n\n"
-                             "Пожалуйста, проверьте файл конфигурации и после попробуйте загрузить ещё раз.")
-        else:
-            test_teachers = df.to_dict("records")
-            for teacher in test_teachers:
-                if "https://edu.sfu-kras.ru/timetable" not in str(teacher["url"]):
-                    raise ValueError(f"Для преподавателя {teacher['фио']} введена неверная ссылка: {teacher['url']}. Убедитесь, что ссылка ведет на сайт расписания СФУ.")
-            self.teachers.clear()
-            self.teachers = test_teachers
-            self.teachers_schedule.clear()
+    def get_status_text(self, teacher_name, schedule):
+        # Статус для окна загрузки: "ok" или текст ошибки, плюс исходы попыток, если их было несколько
+        if not isinstance(schedule, tuple):
+            return schedule
+        attempts = self.fetch_attempts.get(teacher_name, [])
+        if len(attempts) > 1:
+            from logic.transport import format_attempts
+            return f"ok ({format_attempts(attempts)})"
+        return "ok"
 
-    def create_combined_schedule(self, check_only=False, save_file=False, callback=None, keep_groups=False):
+    def load_config_file(self, file_path):
+        from logic.config import load_config
+        teachers = load_config(file_path)  # при ошибках self.teachers не меняется
+        self.teachers = teachers
+        self.config_path = file_path
+        self.last_snapshot = None
+        self.last_run_id = None
+        self.teachers_schedule.clear()
+
+    def create_combined_schedule(self, check_only=False, save_file=False, callback=None, keep_groups=False, file_path=None,
+                                 cancel=None, from_store=False):
+        # Возвращает таблицы (нечётная, чётная, объединённая); при save_file=True сохраняет их в file_path.
+        # cancel - logic.cancel.CancelToken: после отмены остаются уже загруженные расписания.
+        # from_store=True - расписания берутся из последнего сохранённого в базе запуска, без обращения к сайту
+        if from_store:
+            self.load_from_store(callback=callback)
         if not self.teachers:
             raise ValueError("Нет данных", "Сначала загрузите конфигурационный файл.")
-        if check_only or not self.teachers_schedule:
-            self.teachers_schedule.clear()
-            for teacher in self.teachers:
-                schedule = self.get_schedule(teacher["фио"], teacher["url"])
-                self.teachers_schedule[teacher["фио"]] = schedule
-                if callback:
-                    callback(teacher["фио"], schedule)
+        if not from_store and (check_only or not self.teachers_schedule):
+            with self._load_lock:
+                self.teachers_schedule.clear()
+                self.fetch_attempts.clear()
+                self.fetched_at.clear()
+                self.metrics.reset()
+                self.fetch_schedules(self.teachers, callback=callback, cancel=cancel)
         if check_only:
             return
 
@@ -71,506 +170,354 @@ class MainLogic:
         if not teachers:
             raise ValueError("Нет успешных расписаний", "Не удалось загрузить ни одно расписание. Проверьте конфигурацию.")
 
-        odd_df = self.create_schedule_df(odd_schedules, teachers, keep_groups=keep_groups)
-        even_df = self.create_schedule_df(even_schedules, teachers, keep_groups=keep_groups)
-        combined_df = self.create_combined_schedule_df(odd_schedules, even_schedules, teachers, keep_groups=keep_groups)
+        from logic.builder import build_tables
+        with self.metrics.timer("build"):
+            tables = build_tables(odd_schedules, even_schedules, teachers, keep_groups=keep_groups)
+        if save_file:
+            if not file_path:
+                raise ValueError("Не указан файл для сохранения таблицы")
+            self.save_schedule(file_path, tables)
+        return tables
+
+    def get_error_teachers(self):
+        return [f"{teacher}: {status}" for teacher, status in self.get_teacher_statuses().items() if status != "ok"]
+
+    def save_schedule(self, file_path, tables):
+        # Формат по расширению: .xlsx - оформленная книга, .csv/.jsonl/.parquet/.ics - см. logic.formats
+        from logic.formats import format_for_path, write_csv, write_jsonl, write_parquet, write_ics
+        odd_df, even_df, combined_df = tables
+        teachers = list(odd_df.columns[2:])
+        export_format = format_for_path(file_path)
+        try:
+            if export_format == "xlsx":
+                self.save_workbook(file_path, odd_df, even_df, combined_df)
+                return
+            with self.metrics.timer("save"):
+                if export_format == "csv":
+                    write_csv(file_path, tables)
+                elif export_format == "jsonl":
+                    write_jsonl(file_path, tables)
+                elif export_format == "parquet":
+                    write_parquet(file_path, tables)
+                else:
+                    write_ics(file_path, {teacher: self.teachers_schedule[teacher] for teacher in teachers},
+                              self.semester_start, self.semester_end)
+        except PermissionError:
+            raise PermissionError(f"Ошибка сохранения таблицы, возможно в данный момент открыт изменяемый файл ({file_path})")
+
+    def fetch_schedules(self, teachers, callback=None, revalidate=False, cancel=None):
+        with self._load_lock:
+            return self._fetch_schedules(teachers, callback, revalidate, cancel)
+
+    def _fetch_schedules(self, teachers, callback, revalidate, cancel):
+        # Загружаем расписания параллельно, но сохраняем в порядке конфигурации.
+        # Страница, на которую ссылаются несколько ФИО, скачивается один раз.
+        names_by_url = {}
+        for teacher in teachers:
+            names_by_url.setdefault(teacher["url"], []).append(teacher["фио"])
+
+        def on_result(url, page_schedules):
+            if isinstance(page_schedules, str):  # исключение в get_schedules
+                page_schedules = {teacher_name: page_schedules for teacher_name in names_by_url[url]}
+            for teacher_name, schedule in page_schedules.items():
+                self.fetched_at[teacher_name] = time.time()
+                if callback:
+                    callback(teacher_name, schedule)
+
+        jobs = [(url, (names, url)) for url, names in names_by_url.items()]
+        with self.metrics.timer("fetch"):
+            if self.use_parse_pool(len(jobs)):
+                from logic.pipeline import fetch_parse_pipeline, parse_page_timed
+                fetch = functools.partial(self.load_page, revalidate=revalidate, cancel=cancel)
+                pages = fetch_parse_pipeline(jobs, fetch, parse_page_timed, self.parse_pool,
+                                             max_workers=self.max_workers, callback=on_result, cancel=cancel)
+            else:
+                worker = functools.partial(self.get_schedules, revalidate=revalidate, cancel=cancel)
+                pages = fetch_concurrently(jobs, worker, max_workers=self.max_workers, callback=on_result,
+                                           cancel=cancel)
+        self.transport.flush_cache()
+        self.parse_cache.prune()
+        schedules = {}
+        for teacher in teachers:
+            page_schedules = pages.get(teacher["url"])
+            if page_schedules is None:
+                # Загрузку отменили раньше, чем дошла очередь: остаётся прежний результат, если он был
+                schedule = self.teachers_schedule.get(teacher["фио"], cancel.reason)
+                if callback:
+                    callback(teacher["фио"], schedule)
+            elif isinstance(page_schedules, str):
+                schedule = page_schedules
+            else:
+                schedule = page_schedules[teacher["фио"]]
+            schedules[teacher["фио"]] = schedule
+        self.teachers_schedule.update(schedules)
+        # Неполная загрузка дала бы в сравнении ложные изменения, а загрузка без единого расписания
+        # стала бы "последней" и в снимках, и в базе
+        if (cancel is None or not cancel.cancelled) and self.has_schedules():
+            self.save_snapshot()
+            self.save_to_store()
+        return schedules
+
+    def has_schedules(self):
+        return any(isinstance(schedule, tuple) for schedule in self.teachers_schedule.values())
+
+    def save_snapshot(self):
+        if not self.keep_snapshots:
+            return None
+        try:
+            self.last_snapshot = self.snapshot_store.save(self.teachers_schedule, self.config_path)
+        except OSError:
+            self.last_snapshot = None  # снимок - дополнительная возможность, загрузку он не прерывает
+        return self.last_snapshot
+
+    def diff_with_previous(self):
+        """Изменения последнего снимка относительно предыдущего снимка того же конфига:
+        (список изменений, путь к предыдущему снимку) или (None, None), если сравнивать не с чем."""
+        from logic.snapshots import load_snapshot, diff_snapshots
+        if self.last_snapshot is None:
+            return None, None
+        previous = self.snapshot_store.previous(self.config_path, before=self.last_snapshot)
+        if previous is None:
+            return None, None
+        return diff_snapshots(load_snapshot(previous), load_snapshot(self.last_snapshot)), previous
+
+    def store_config_key(self):
+        # Запуски в базе привязаны к полному пути конфига, чтобы не зависеть от текущего каталога
+        return os.path.abspath(self.config_path) if self.config_path else None
+
+    def save_to_store(self, source="сайт"):
+        if not self.keep_store:
+            return None
+        import sqlite3
+        try:
+            self.last_run_id = self.schedule_store.save_run(self.teachers, self.teachers_schedule, self.fetch_attempts,
+                                                            self.fetched_at, self.store_config_key(), source)
+        except (OSError, sqlite3.Error):
+            self.last_run_id = None  # как и снимок, база не должна прерывать загрузку
+        return self.last_run_id
+
+    def load_from_store(self, run_id=None, callback=None, cancel=None):
+        """Восстанавливает расписания из базы (logic.store) без обращения к сайту: запуск run_id
+        или последний удачный запуск текущего конфига. Без загруженного конфига преподаватели берутся из запуска.
+        Если cancel отменили, пока запуск читался из базы, текущие расписания остаются как были."""
+        import sqlite3
+        from logic.store import MISSING_IN_RUN
+        with self._load_lock:
+            try:
+                if run_id is None:
+                    run_id = self.schedule_store.latest_run(self.store_config_key())
+                    if run_id is None:
+                        raise ValueError("Нет сохранённых расписаний",
+                                         "В базе нет удачных загрузок этого конфига - сначала загрузите расписания с сайта.")
+                teachers, schedules, fetch_attempts, fetched_at = self.schedule_store.load_run(run_id)
+            except (OSError, sqlite3.Error) as e:
+                raise ValueError("Ошибка базы расписаний", str(e))
+            if cancel is not None and cancel.cancelled:
+                return dict(self.teachers_schedule)
+            if not self.teachers:
+                self.teachers = teachers
+            self.teachers_schedule.clear()
+            self.fetch_attempts.clear()
+            self.fetched_at.clear()
+            self.metrics.reset()
+            for teacher in self.teachers:
+                schedule = schedules.get(teacher["фио"], MISSING_IN_RUN)
+                self.teachers_schedule[teacher["фио"]] = schedule
+                self.fetch_attempts[teacher["фио"]] = fetch_attempts.get(teacher["фио"], [])
+                if teacher["фио"] in fetched_at:
+                    self.fetched_at[teacher["фио"]] = fetched_at[teacher["фио"]]
+                if callback:
+                    callback(teacher["фио"], schedule)
+            self.last_run_id = run_id
+        return dict(self.teachers_schedule)
+
+    def load_offline(self, source, callback=None, cancel=None):
+        """Расписания из сохранённых страниц вместо сайта: каталог или архив zip/tar (см. logic.offline).
+        Разбор идёт в пуле процессов parse_pool; после отмены cancel остальные получают cancel.reason."""
+        from logic.offline import PageArchive, load_archive_schedules
+        from logic.parser import DEFAULT_BACKEND
+        if not self.teachers:
+            raise ValueError("Нет данных", "Сначала загрузите конфигурационный файл.")
 
-        if not save_file:
-            return
+        def on_result(teacher_name, schedule):
+            self.fetch_attempts[teacher_name] = ["архив"]
+            self.fetched_at[teacher_name] = time.time()
+            self.record_teacher_metrics(teacher_name, 0.0, 0.0, "", ["архив"], schedule)
+            if callback:
+                callback(teacher_name, schedule)
 
-        file_path = filedialog.asksaveasfilename(
-            title="Сохранить объединенное расписание",
-            defaultextension=".xlsx",
-            filetypes=(("Excel files", "*.xlsx"), ("All files", "*.*"))
-        )
-        if file_path:
-            error_teachers = [f"{teacher}: {status}" for teacher, status in self.get_teacher_statuses().items() if status != "ok"]
-            if error_teachers:
-                messagebox.showwarning("Предупреждение", "Расписание создано, но есть ошибки:\n" + "\n".join(error_teachers))
-            try:
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    odd_df.to_excel(writer, sheet_name="1 нед", index=False)
-                    even_df.to_excel(writer, sheet_name="2 нед", index=False)
-                    combined_df.to_excel(writer, sheet_name="Объединённое расписание", index=False,startrow=1)
-                    workbook = writer.book
-                    for sheet_name in ["1 нед", "2 нед"]:
-                        worksheet = writer.sheets[sheet_name]
-                        self.apply_formatting(worksheet, teachers)
-                    combined_worksheet = writer.sheets["Объединённое расписание"]
-                    self.apply_combined_formatting(combined_worksheet, teachers)
-                messagebox.showinfo("Готово", "Объединённое расписание успешно создано!")
-            except PermissionError:
-                raise PermissionError(f"Ошибка сохранения таблицы, возможно в данный момент открыт изменяемый файл ({file_path})")
+        with self._load_lock, PageArchive(source) as archive:
+            self.teachers_schedule.clear()
+            self.fetch_attempts.clear()
+            self.fetched_at.clear()
+            self.metrics.reset()
+            with self.metrics.timer("fetch"):
+                schedules = load_archive_schedules(archive, self.teachers, self.parse_pool,
+                                                   self.parser_backend or DEFAULT_BACKEND,
+                                                   self.parse_cache if self.use_cache else None, callback=on_result,
+                                                   cancel=cancel)
+            if cancel is not None and cancel.cancelled:
+                for teacher in self.teachers:
+                    if teacher["фио"] not in schedules and callback:
+                        callback(teacher["фио"], cancel.reason)
+                schedules = {teacher["фио"]: schedules.get(teacher["фио"], cancel.reason) for teacher in self.teachers}
+            self.teachers_schedule.update(schedules)
+            if (cancel is None or not cancel.cancelled) and self.has_schedules():
+                self.save_snapshot()
+                self.save_to_store("архив")
+        return schedules
+
+    def refresh_schedules(self, mode="failed", callback=None, max_age_minutes=None, teacher_name=None, cancel=None):
+        """Перезагружает только часть преподавателей, остальные результаты остаются на месте.
+
+        mode="failed" - только те, у кого ошибка; "stale" - загруженные раньше, чем max_age_minutes
+        минут назад; "teacher" - один преподаватель teacher_name. Возвращает список обновлённых ФИО.
+        """
+        selected = self.select_for_refresh(mode, max_age_minutes, teacher_name)
+        if selected:
+            # Обновляем явно - свежие по TTL страницы перепроверяются условным запросом
+            self.fetch_schedules(selected, callback=callback, revalidate=True, cancel=cancel)
+        return [t["фио"] for t in selected]
+
+    def select_for_refresh(self, mode="failed", max_age_minutes=None, teacher_name=None):
+        # Преподаватели из конфигурации, которых обновит refresh_schedules с теми же аргументами
+        if not self.teachers:
+            raise ValueError("Нет данных", "Сначала загрузите конфигурационный файл.")
+        if mode == "failed":
+            selected = [t for t in self.teachers if not isinstance(self.teachers_schedule.get(t["фио"]), tuple)]
+        elif mode == "stale":
+            if max_age_minutes is None:
+                raise ValueError("Не указан возраст устаревших расписаний")
+            oldest = time.time() - max_age_minutes * 60
+            selected = [t for t in self.teachers if self.fetched_at.get(t["фио"], 0) < oldest]
+        elif mode == "teacher":
+            selected = [t for t in self.teachers if t["фио"] == teacher_name]
+            if not selected:
+                raise ValueError(f"Преподаватель {teacher_name} не найден в конфигурации")
         else:
-            messagebox.showwarning("Отменено", "Сохранение файла было отменено.")
+            raise ValueError(f"Неизвестный режим обновления: {mode}")
+        return selected
+
+    def build_slot_index(self):
+        # Матрица занятости по уже загруженным расписаниям, см. logic.slots.SlotIndex
+        from logic.slots import SlotIndex
+        return SlotIndex(self.teachers_schedule)
+
+    def build_group_index(self):
+        # Расписания групп по уже загруженным расписаниям преподавателей, см. logic.groups.GroupIndex
+        from logic.groups import GroupIndex
+        return GroupIndex(self.teachers_schedule)
+
+    def save_group_schedule(self, file_path, groups=None):
+        from logic.groups import save_group_workbook
+        try:
+            save_group_workbook(file_path, self.build_group_index(), groups)
+        except PermissionError:
+            raise PermissionError(f"Ошибка сохранения таблицы, возможно в данный момент открыт изменяемый файл ({file_path})")
+
+    def build_room_index(self):
+        # Занятость аудиторий по уже загруженным расписаниям, см. logic.rooms.RoomIndex
+        from logic.rooms import RoomIndex
+        return RoomIndex(self.teachers_schedule)
+
+    def save_room_report(self, file_path):
+        from logic.rooms import save_room_workbook
+        try:
+            save_room_workbook(file_path, self.build_room_index())
+        except PermissionError:
+            raise PermissionError(f"Ошибка сохранения таблицы, возможно в данный момент открыт изменяемый файл ({file_path})")
+
+    def get_teacher_urls(self):
+        urls = dict()
+        for teacher in self.teachers:
+            if "url" in teacher:
+                urls.setdefault(teacher["фио"], teacher["url"])
+        return urls
+
+    def save_workbook(self, file_path, odd_df, even_df, combined_df):
+        # Потоковая запись с готовыми стилями, см. logic.export
+        from logic.export import save_schedule_workbook
+        save_schedule_workbook(file_path, odd_df, even_df, combined_df, self.get_teacher_urls(), metrics=self.metrics)
 
     def create_combined_schedule_df(self, odd_schedules, even_schedules, teachers, keep_groups=False):
-        days_order = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
-        rows = []
-        columns = ["№", "Время"] + sum([[f"{teacher} (Нечётная)", f"{teacher} (Чётная)"] for teacher in teachers], [])
-
-        for day in days_order:
-            day_lessons = set()
-            has_slots = False
-            for teacher in teachers:
-                if teacher in odd_schedules and day in odd_schedules[teacher]:
-                    for lesson in odd_schedules[teacher][day]:
-                        номер, время = lesson[0], lesson[1]
-                        day_lessons.add((номер, время))
-                        has_slots = True
-                if teacher in even_schedules and day in even_schedules[teacher]:
-                    for lesson in even_schedules[teacher][day]:
-                        номер, время = lesson[0], lesson[1]
-                        day_lessons.add((номер, время))
-                        has_slots = True
-
-            if has_slots:
-                lessons = sorted(list(day_lessons), key=lambda x: int(x[0]))
-                day_added = False
-                for номер, время in lessons:
-                    row = [номер, время]
-                    has_data = False
-                    for teacher in teachers:
-                        odd_lesson = ""
-                        even_lesson = ""
-                        if teacher in odd_schedules and day in odd_schedules[teacher]:
-                            lessons_for_time = [l for l in odd_schedules[teacher][day] if
-                                                l[0] == номер and l[1] == время]
-                            if lessons_for_time and lessons_for_time[0][2].strip():
-                                has_data = True
-                                if not keep_groups:
-                                    shift_lesson_all_info = lessons_for_time[0][2].split("\n")
-                                    shift_groups = shift_lesson_all_info[0]
-                                    shift_groups_deleted_repeats = re.sub(
-                                        r'\s*\(?(\d+\s*подгрупп[а-я]*|подгрупп[а-я]*\s*\d+)\)?\s*',
-                                        '',
-                                        shift_groups,
-                                        flags=re.IGNORECASE
-                                    ).split(", ")
-                                    unique_groups_names = ", ".join(set(shift_groups_deleted_repeats))
-                                    shift_lesson_all_info = unique_groups_names + "\n" + "\n".join(
-                                        shift_lesson_all_info[1:])
-                                    odd_lesson = shift_lesson_all_info
-                                else:
-                                    #odd_lesson = lessons_for_time[0][2]
-                                    shift_lesson_all_info = lessons_for_time[0][2].split("\n")
-                                    shift_groups = shift_lesson_all_info[0].split(", ")
-                                    shift_changed_groups = []
-                                    for num_group in range(len(shift_groups)):
-                                        if num_group % 2 != 0:
-                                            shift_changed_groups.append(shift_groups[num_group] + "\n")
-                                        else:
-                                            if num_group + 1 == len(shift_groups):
-                                                shift_changed_groups.append(shift_groups[num_group] + "\n")
-                                            else:
-                                                shift_changed_groups.append(shift_groups[num_group] + ", ")
-                                    shift_lesson_all_info = "".join(shift_changed_groups) + "\n".join(
-                                        shift_lesson_all_info[1:])
-                                    #row.append(shift_lesson_all_info)
-                                    odd_lesson = shift_lesson_all_info
-
-
-                        if teacher in even_schedules and day in even_schedules[teacher]:
-                            lessons_for_time = [l for l in even_schedules[teacher][day] if
-                                                l[0] == номер and l[1] == время]
-                            if lessons_for_time and lessons_for_time[0][2].strip():
-                                has_data = True
-                                if not keep_groups:
-                                    shift_lesson_all_info = lessons_for_time[0][2].split("\n")
-                                    shift_groups = shift_lesson_all_info[0]
-                                    shift_groups_deleted_repeats = re.sub(
-                                        r'\s*\(?(\d+\s*подгрупп[а-я]*|подгрупп[а-я]*\s*\d+)\)?\s*',
-                                        '',
-                                        shift_groups,
-                                        flags=re.IGNORECASE
-                                    ).split(", ")
-                                    unique_groups_names = ", ".join(set(shift_groups_deleted_repeats))
-                                    shift_lesson_all_info = unique_groups_names + "\n" + "\n".join(
-                                        shift_lesson_all_info[1:])
-                                    even_lesson = shift_lesson_all_info
-                                else:
-                                    #even_lesson = lessons_for_time[0][2]
-                                    shift_lesson_all_info = lessons_for_time[0][2].split("\n")
-                                    shift_groups = shift_lesson_all_info[0].split(", ")
-                                    shift_changed_groups = []
-                                    for num_group in range(len(shift_groups)):
-                                        if num_group % 2 != 0:
-                                            shift_changed_groups.append(shift_groups[num_group] + "\n")
-                                        else:
-                                            if num_group + 1 == len(shift_groups):
-                                                shift_changed_groups.append(shift_groups[num_group] + "\n")
-                                            else:
-                                                shift_changed_groups.append(shift_groups[num_group] + ", ")
-                                    shift_lesson_all_info = "".join(shift_changed_groups) + "\n".join(
-                                        shift_lesson_all_info[1:])
-                                    #row.append(shift_lesson_all_info)
-                                    even_lesson = shift_lesson_all_info
-                        row.append(odd_lesson)
-                        row.append(even_lesson)
-                    if has_data:
-                        if not day_added:
-                            rows.append([day] + [""] * (len(teachers) * 2 + 1))
-                            day_added = True
-                        rows.append(row)
-
-        df = pd.DataFrame(rows, columns=columns)
-        return df
-
-    def apply_combined_formatting(self, worksheet, teachers):
-        days_order = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
-        header_fill = PatternFill(start_color="5f8a96", end_color="5f8a96", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        day_fill = PatternFill(start_color="ff6600", end_color="ff6600", fill_type="solid")
-        day_font = Font(bold=True, color="FFFFFF")
-        subject_fill = PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")
-        discipline_font = Font(color="5f8a96", bold=True)
-        default_font = Font(color="000000")
-        hyperlink_font = Font(color="5f8a96", bold=True, underline="single")
-        medium_border = Border(left=Side(style='medium', color='cccccc'),
-                               right=Side(style='medium', color='cccccc'),
-                               top=Side(style='medium', color='cccccc'),
-                               bottom=Side(style='medium', color='cccccc'))
-        thick_bottom_border = Border(bottom=Side(style='thick', color='5f8a96'))
-        day_alignment = Alignment(horizontal="left", vertical="center", indent=1, wrap_text=True)
-        center_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        cell_alignment = Alignment(horizontal="left", vertical="top", indent=1, wrap_text=True)
-
-        # Установка ширины столбцов
-        worksheet.column_dimensions['A'].width = 74 / 7.5  # №
-        worksheet.column_dimensions['B'].width = 100 / 7.5  # Время
-        for col in range(3, worksheet.max_column + 1):
-            max_length = 0
-            for row in range(2, worksheet.max_row + 1):
-                cell = worksheet.cell(row=row, column=col)
-                if cell.value:
-                    text = str(cell.value)
-                    lines = text.split('\n')
-                    for line in lines:
-                        max_length = max(max_length, len(line))
-            adjusted_width = max_length + 2 if max_length > 0 else 10
-            worksheet.column_dimensions[get_column_letter(col)].width = adjusted_width
-
-        worksheet.cell(row=1, column=1).value = ""
-        worksheet.cell(row=1, column=2).value = ""
-
-        # Форматирование заголовков (строка 1 - имена преподавателей)
-        for teacher_idx, teacher in enumerate(teachers):
-            col_start = 3 + teacher_idx * 2  # Начало пары столбцов (Нечётная)
-            col_end = col_start + 1  # Конец пары столбцов (Чётная)
-            worksheet.merge_cells(start_row=1, start_column=col_start, end_row=1, end_column=col_end)
-            cell = worksheet.cell(row=1, column=col_start)
-            cell.value = teacher
-            cell.fill = subject_fill
-            cell.font = hyperlink_font
-            cell.alignment = center_alignment
-            cell.border = medium_border
-
-            # Добавляем гиперссылку если есть URL
-            for t in self.teachers:
-                if t["фио"] == teacher and "url" in t:
-                    cell.hyperlink = t["url"]
-                    # Явно переустанавливаем форматирование после гиперссылки
-                    cell.font = hyperlink_font
-                    cell.alignment = center_alignment
-                    break
-
-        # Форматирование строки 2 (заголовки столбцов)
-        worksheet.row_dimensions[2].height = 15.75
-        for col in range(1, worksheet.max_column + 1):
-            cell = worksheet.cell(row=2, column=col)
-            if col == 1:
-                cell.value = "№"
-            elif col == 2:
-                cell.value = "Время"
-            elif col % 2 == 1:
-                cell.value = "Нечётная неделя"
-            else:
-                cell.value = "Чётная неделя"
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_alignment
-            cell.border = medium_border
-        # Форматирование данных
-        for row in range(3, worksheet.max_row + 1):
-            first_cell = worksheet.cell(row=row, column=1)
-            if first_cell.value in days_order:
-                worksheet.merge_cells(start_row=row, start_column=1, end_row=row, end_column=worksheet.max_column)
-                for col in range(1, worksheet.max_column + 1):
-                    day_cell = worksheet.cell(row=row, column=col)
-                    day_cell.fill = day_fill
-                    day_cell.font = day_font
-                    day_cell.alignment = day_alignment
-                    day_cell.border = thick_bottom_border
-                    if col == 1:
-                        day_cell.value = first_cell.value
-            else:
-                num_cell = worksheet.cell(row=row, column=1)
-                time_cell = worksheet.cell(row=row, column=2)
-                num_cell.alignment = center_alignment
-                time_cell.alignment = center_alignment
-                num_cell.border = medium_border
-                time_cell.border = medium_border
-                num_cell.font = default_font
-                time_cell.font = default_font
-                for col in range(3, worksheet.max_column + 1):
-                    subject_cell = worksheet.cell(row=row, column=col)
-                    if subject_cell.value:
-                        lines = str(subject_cell.value).split('\n')
-                        if len(lines) >= 3:
-                            subject_cell.value = "\n".join(lines)
-                            subject_cell.font = discipline_font
-                        elif len(lines) == 2:
-                            subject_cell.value = f"{lines[0]}\n{lines[1]}"
-                            subject_cell.font = discipline_font
-                        else:
-                            subject_cell.value = lines[0]
-                            subject_cell.font = default_font
-                    subject_cell.fill = subject_fill
-                    subject_cell.alignment = cell_alignment
-                    subject_cell.border = medium_border
-
-    def apply_formatting(self, worksheet, teachers):
-        days_order = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
-        header_fill = PatternFill(start_color="5f8a96", end_color="5f8a96", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        day_fill = PatternFill(start_color="ff6600", end_color="ff6600", fill_type="solid")
-        day_font = Font(bold=True, color="FFFFFF")
-        subject_fill = PatternFill(start_color="f0f0f0", end_color="f0f0f0", fill_type="solid")
-        discipline_font = Font(color="5f8a96", bold=True)
-        default_font = Font(color="000000")
-        hyperlink_font = Font(color="5f8a96", bold=True)
-        medium_border = Border(left=Side(style='medium', color='cccccc'),
-                               right=Side(style='medium', color='cccccc'),
-                               top=Side(style='medium', color='cccccc'),
-                               bottom=Side(style='medium', color='cccccc'))
-        thick_bottom_border = Border(bottom=Side(style='thick', color='5f8a96'))
-        day_alignment = Alignment(horizontal="left", vertical="center", indent=1, wrap_text=True)
-        center_alignment = Alignment(horizontal="center", vertical="center", indent=1, wrap_text=True)
-        cell_alignment = Alignment(horizontal="left", vertical="top", indent=1, wrap_text=True)
-
-        worksheet.column_dimensions['A'].width = 74 / 7.5
-        worksheet.column_dimensions['B'].width = 100 / 7.5
-        for col in range(3, worksheet.max_column + 1):
-            max_length = 0
-            for row in range(2, worksheet.max_row + 1):
-                cell = worksheet.cell(row=row, column=col)
-                if cell.value:
-                    text = str(cell.value)
-                    lines = text.split('\n')
-                    for line in lines:
-                        max_length = max(max_length, len(line))
-            adjusted_width = max_length + 2 if max_length > 0 else 10
-            worksheet.column_dimensions[get_column_letter(col)].width = adjusted_width
-
-        for col in range(1, worksheet.max_column + 1):
-            cell = worksheet.cell(row=1, column=col)
-            if col <= 2:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = center_alignment
-                cell.border = medium_border
-            else:
-                cell.fill = subject_fill
-                cell.font = hyperlink_font
-                cell.alignment = cell_alignment
-                cell.border = medium_border
-                teacher_index = col - 3
-                if teacher_index < len(teachers):
-                    teacher = teachers[teacher_index]
-                    for t in self.teachers:
-                        if t["фио"] == teacher and "url" in t:
-                            cell.hyperlink = t["url"]
-                            cell.style = "Hyperlink"
-                            break
-
-        for row in range(2, worksheet.max_row + 1):
-            first_cell = worksheet.cell(row=row, column=1)
-            if first_cell.value in days_order:
-                worksheet.merge_cells(start_row=row, start_column=1, end_row=row, end_column=worksheet.max_column)
-                for col in range(1, worksheet.max_column + 1):
-                    day_cell = worksheet.cell(row=row, column=col)
-                    day_cell.fill = day_fill
-                    day_cell.font = day_font
-                    day_cell.alignment = day_alignment
-                    day_cell.border = thick_bottom_border
-                    if col == 1:
-                        day_cell.value = first_cell.value
-            else:
-                num_cell = worksheet.cell(row=row, column=1)
-                time_cell = worksheet.cell(row=row, column=2)
-                num_cell.alignment = center_alignment
-                time_cell.alignment = center_alignment
-                num_cell.border = medium_border
-                time_cell.border = medium_border
-                num_cell.font = default_font
-                time_cell.font = default_font
-                for col in range(3, worksheet.max_column + 1):
-                    subject_cell = worksheet.cell(row=row, column=col)
-                    if subject_cell.value:
-                        lines = str(subject_cell.value).split('\n')
-                        if len(lines) >= 3:
-                            subject_cell.value = "\n".join(lines)
-                            subject_cell.font = discipline_font
-                        elif len(lines) == 2:
-                            subject_cell.value = f"{lines[0]}\n{lines[1]}"
-                            subject_cell.font = discipline_font
-                        else:
-                            subject_cell.value = lines[0]
-                            subject_cell.font = default_font
-                    subject_cell.fill = subject_fill
-                    subject_cell.alignment = cell_alignment
-                    subject_cell.border = medium_border
+        from logic.builder import build_tables
+        return build_tables(odd_schedules, even_schedules, teachers, keep_groups=keep_groups)[2]
 
     def create_schedule_df(self, schedules, teachers, keep_groups=False):
-        days_order = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота"]
-        rows = []
-
-        for day in days_order:
-            day_lessons = set()
-            for teacher in teachers:
-                if teacher in schedules and day in schedules[teacher]:
-                    for lesson in schedules[teacher][day]:
-                        номер, время = lesson[0], lesson[1]
-                        day_lessons.add((номер, время))
-
-            if day_lessons:
-                fl = True
-                lessons = sorted(list(day_lessons), key=lambda x: int(x[0]))
-                for номер, время in lessons:
-                    row = [номер, время]
-                    for teacher in teachers:
-                        if teacher in schedules and day in schedules[teacher]:
-                            lessons_for_time = [l for l in schedules[teacher][day] if l[0] == номер and l[1] == время]
-                            if lessons_for_time and lessons_for_time[0][2].strip():
-                                if not keep_groups:
-                                    shift_lesson_all_info = lessons_for_time[0][2].split("\n")
-                                    shift_groups = shift_lesson_all_info[0]
-                                    shift_groups_deleted_repeats = re.sub(
-                                        r'\s*\(?(\d+\s*подгрупп[а-я]*|подгрупп[а-я]*\s*\d+)\)?\s*',
-                                        '',
-                                        shift_groups,
-                                        flags=re.IGNORECASE
-                                    ).split(", ")
-                                    unique_groups_names = ", ".join(set(shift_groups_deleted_repeats))
-                                    shift_lesson_all_info = unique_groups_names + "\n" + "\n".join(shift_lesson_all_info[1:])
-                                    row.append(shift_lesson_all_info)
-                                else:
-                                    shift_lesson_all_info = lessons_for_time[0][2].split("\n")
-                                    shift_groups = shift_lesson_all_info[0].split(", ")
-                                    shift_changed_groups = []
-                                    for num_group in range(len(shift_groups)):
-                                        if num_group % 2 != 0:
-                                            shift_changed_groups.append(shift_groups[num_group] + "\n")
-                                        else:
-                                            if num_group + 1 == len(shift_groups):
-                                                shift_changed_groups.append(shift_groups[num_group] + "\n")
-                                            else:
-                                                shift_changed_groups.append(shift_groups[num_group] + ", ")
-                                    shift_lesson_all_info = "".join(shift_changed_groups) + "\n".join(shift_lesson_all_info[1:])
-                                    row.append(shift_lesson_all_info)
-                            else:
-                                row.append("")
-                        else:
-                            row.append("")
-                    if any(cell != "" for cell in row[2:]):
-                        if fl:
-                            rows.append([day] + [""] * (len(teachers) + 1))
-                            fl = False
-                        rows.append(row)
-
-        columns = ["№", "Время"] + teachers
-        df = pd.DataFrame(rows, columns=columns)
-        return df
-
-    def get_schedule(self, teacher_name, url):
-        response = requests.get(url, verify=False)
-        html = response.text
-        soup = BeautifulSoup(html, 'html.parser')
-        table = soup.find('table', class_='table timetable')
-        if table is None:
-            return "Таблица не найдена!"
-        rows = table.find_all('tr')
-        if len(rows) == 0:
-            return "Неправильная ссылка на расписание"
-        if teacher_name[-1] != "." or teacher_name not in html:
-            return "Неправильное имя преподавателя"
-
-        odd_week_schedule = {}
-        even_week_schedule = {}
-        current_heading = None
-        def extract_text_with_commas_and_breaks(td):
-            result = []
-            group_names = []
-            group_set = set()
-            current_line = []
-            coun_br = 0
-            for elem in td.contents:
-                if isinstance(elem, NavigableString):
-                    text_ = elem.strip()
-                    if text_ and text_ != ',':
-                        current_line.append(text_)
-                elif isinstance(elem, Tag):
-                    if elem.name == "br":
-                        coun_br += 1
-                        if current_line:
-                            line = ' '.join(current_line).strip()
-                            if line:
-                                result.append(line)
-                            current_line = []
-                    elif elem.name == "a" and "e.sfu-kras.ru" in elem.get("href", ""):
-                        result.append(elem.get("href"))
-                    else:
-                        text_ = elem.get_text(strip=True)
-                        if "подгруппа" in text_:
-                            base_name = text_
-                            if base_name not in group_set:
-                                group_set.add(base_name)
-                                group_names.append(base_name)
-                        elif coun_br == 0:
-                            group_set.add(text_)
-                            group_names.append(text_)
-                        else:
-                            current_line.append(text_)
-
-            if current_line:
-                line = ' '.join(current_line).strip()
-                if line:
-                    result.append(line)
-            if len(result) > 2 and not (result[-2].lower().strip() == "эиос"):
-                result.pop(-1)
-            output = ''
-            if group_names:
-                output += ', '.join(group_names)
-            if result:
-                if output:
-                    output += '\n'
-                output += '\n'.join(result)
-            output = output.replace(teacher_name + "\n", "")
-            output = output.replace("ЭИОС\n", "ЭИОС, ")
-            return output.strip()
-
-        for row in rows:
-            if "heading-section" in row.get("class", []):
-                current_heading = row.get_text(separator=' ', strip=True)
-                odd_week_schedule[current_heading] = []
-                even_week_schedule[current_heading] = []
-            if "table-center" in row.get("class", []):
-                tds = row.find_all("td")
-                if len(tds) > 3:
-                    num_of_lesson = tds[0].get_text(separator=' ', strip=True)
-                    time_of_lesson = tds[1].get_text(separator=' ', strip=True)
-                    text_odd = extract_text_with_commas_and_breaks(tds[2]).strip()
-                    text_even = extract_text_with_commas_and_breaks(tds[3]).strip()
-                    lesson_odd = [num_of_lesson, time_of_lesson, text_odd]
-                    lesson_even = [num_of_lesson, time_of_lesson, text_even]
-                    odd_week_schedule[current_heading].append(lesson_odd)
-                    even_week_schedule[current_heading].append(lesson_even)
-                elif len(tds) == 3:
-                    num_of_lesson = tds[0].get_text(separator=' ', strip=True)
-                    time_of_lesson = tds[1].get_text(separator=' ', strip=True)
-                    text = extract_text_with_commas_and_breaks(tds[2]).strip()
-                    lesson = [num_of_lesson, time_of_lesson, text]
-                    odd_week_schedule[current_heading].append(lesson)
-                    even_week_schedule[current_heading].append(lesson)
-
-        return (odd_week_schedule, even_week_schedule)
\ No newline at end of file
+        from logic.builder import build_tables
+        return build_tables(schedules, {}, teachers, keep_groups=keep_groups)[0]
+
+    def get_schedule(self, teacher_name, url, use_cache=None, revalidate=False):
+        return self.get_schedules([teacher_name], url, use_cache=use_cache, revalidate=revalidate)[teacher_name]
+
+    def get_schedules(self, teacher_names, url, use_cache=None, revalidate=False, cancel=None):
+        # Одна загрузка страницы и разбор для каждого ФИО, которое на неё ссылается: {ФИО: расписание}.
+        # После отмены cancel бросает LoadCancelled и ничего не записывает
+        from logic.pipeline import ParseTask, parse_page_timed
+        page = self.load_page(teacher_names, url, use_cache, revalidate, cancel)
+        if isinstance(page, ParseTask):
+            page = page.finish(parse_page_timed(*page.args))
+        return page
+
+    def load_page(self, teacher_names, url, use_cache=None, revalidate=False, cancel=None):
+        """Загрузка страницы без разбора: {ФИО: расписание}, если разбирать нечего (ошибка загрузки
+        или все разборы нашлись в кэше), иначе logic.pipeline.ParseTask для остальных ФИО."""
+        from logic.parser import DEFAULT_BACKEND
+        from logic.pipeline import ParseTask
+        from logic.transport import FetchError
+        if use_cache is None:
+            use_cache = self.use_cache
+        backend = self.parser_backend or DEFAULT_BACKEND
+        start = time.perf_counter()
+        try:
+            html, attempts = self.transport.fetch(url, use_cache=use_cache, revalidate=revalidate, cancel=cancel)
+            if cancel is not None:
+                cancel.check()
+            if self.page_archive is not None:
+                self.page_archive.add(url, teacher_names, html)
+        except FetchError as e:
+            if cancel is not None:
+                cancel.check()  # брошенный после отмены поток не должен затереть статусы новой загрузки
+            latency = time.perf_counter() - start
+            for teacher_name in teacher_names:
+                self.fetch_attempts[teacher_name] = e.attempts
+                self.record_teacher_metrics(teacher_name, latency, 0.0, "", e.attempts, str(e))
+            return {teacher_name: str(e) for teacher_name in teacher_names}
+        latency = time.perf_counter() - start
+        schedules = {}
+        pending = []
+        for teacher_name in teacher_names:
+            lookup_start = time.perf_counter()
+            self.fetch_attempts[teacher_name] = attempts
+            schedule = self.parse_cache.get(teacher_name, html, backend) if use_cache else None
+            if schedule is None:
+                pending.append(teacher_name)
+                continue
+            self.record_teacher_metrics(teacher_name, latency, time.perf_counter() - lookup_start, html, attempts, schedule)
+            schedules[teacher_name] = schedule
+        if not pending:
+            return schedules
+
+        def finish(parsed):
+            # parsed - {ФИО: (расписание, секунды разбора)}, см. logic.pipeline.parse_page_timed
+            if cancel is not None:
+                cancel.check()
+            for teacher_name, (schedule, parse_seconds) in parsed.items():
+                self.parse_cache.put(teacher_name, html, backend, schedule)
+                self.record_teacher_metrics(teacher_name, latency, parse_seconds, html, attempts, schedule)
+                schedules[teacher_name] = schedule
+            return {teacher_name: schedules[teacher_name] for teacher_name in teacher_names}
+        return ParseTask((html, pending, backend), finish)
+
+    def record_teacher_metrics(self, teacher_name, latency, parse_seconds, html, attempts, schedule):
+        if not self.metrics.enabled:
+            return
+        self.metrics.teacher(
+            teacher_name,
+            latency=latency,
+            size=len(html.encode("utf-8")),
+            retries=max(len(attempts) - 1, 0),
+            parse=parse_seconds,
+            cached=bool(attempts) and attempts[-1] in ("кэш", "304", "устаревший кэш"),
+            status=self.get_status_text(teacher_name, schedule),
+        )
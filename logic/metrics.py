@@ -0,0 +1,99 @@
+import csv
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Этапы запуска: скачивание с разбором, сборка таблиц, оформление листов, запись файла
+RUN_STAGES = ["fetch", "build", "formatting", "save"]
+TEACHER_FIELDS = ["latency", "size", "retries", "parse", "cached", "status"]
+
+
+class NullMetrics:
+    """Замеры выключены: все вызовы ничего не делают."""
+    enabled = False
+
+    def reset(self):
+        pass
+
+    def teacher(self, teacher_name, **values):
+        pass
+
+    def stage(self, name, seconds):
+        pass
+
+    @contextmanager
+    def timer(self, name):
+        yield
+
+
+NULL_METRICS = NullMetrics()
+
+
+class RunMetrics(NullMetrics):
+    """Замеры одного запуска: по преподавателям (время ответа сайта, размер страницы,
+    число повторов, время разбора) и по этапам. callback(kind, name, values) вызывается
+    на каждую запись, kind - "teacher" или "stage"; вызовы идут из рабочих потоков."""
+    enabled = True
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.teachers = {}
+        self.stages = {}
+
+    def reset(self):
+        with self.lock:
+            self.teachers.clear()
+            self.stages.clear()
+
+    def teacher(self, teacher_name, **values):
+        with self.lock:
+            self.teachers[teacher_name] = values
+        if self.callback:
+            self.callback("teacher", teacher_name, values)
+
+    def stage(self, name, seconds):
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.callback:
+            self.callback("stage", name, {"seconds": seconds})
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage(name, time.perf_counter() - start)
+
+    def slowest(self, count=5):
+        # Самые медленные преподаватели по сумме времени ответа и разбора
+        with self.lock:
+            items = list(self.teachers.items())
+        items.sort(key=lambda item: item[1]["latency"] + item[1]["parse"], reverse=True)
+        return items[:count]
+
+    def report(self):
+        with self.lock:
+            return {
+                "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                "teachers": [{"name": name, **{field: round(value, 4) if isinstance(value, float) else value
+                                                for field, value in values.items()}}
+                             for name, values in self.teachers.items()],
+            }
+
+    def save_report(self, file_path):
+        # Формат по расширению: .csv - таблица (этапы и преподаватели), иначе JSON
+        report = self.report()
+        if file_path.lower().endswith(".csv"):
+            with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f, delimiter=";")
+                writer.writerow(["kind", "name", "seconds"] + TEACHER_FIELDS)
+                for name, seconds in report["stages"].items():
+                    writer.writerow(["stage", name, seconds] + [""] * len(TEACHER_FIELDS))
+                for teacher in report["teachers"]:
+                    writer.writerow(["teacher", teacher["name"], ""] + [teacher.get(field, "") for field in TEACHER_FIELDS])
+        else:
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
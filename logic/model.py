@@ -0,0 +1,86 @@
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+
+
+class Lesson(namedtuple("Lesson", ["number", "time", "text"])):
+    # Кортеж вместо списка [номер, время, текст]: меньше памяти, а индексы 0/1/2 работают как раньше
+    __slots__ = ()
+
+    @property
+    def room(self):
+        # Аудитория из текста занятия, см. logic.parser.extract_room (результат кэшируется по тексту)
+        from logic.parser import extract_room
+        return extract_room(self.text)
+
+
+class WeekSchedule(Mapping):
+    """Расписание преподавателя на одну неделю.
+
+    Как словарь ведёт себя так же, как прежний {день: [[номер, время, текст], ...]},
+    а lesson_at(день, номер, время) находит занятие за O(1) по индексу слотов.
+    """
+
+    __slots__ = ("_days", "_index")
+
+    def __init__(self):
+        self._days = {}
+        self._index = {}
+
+    def add_day(self, day):
+        self._days.setdefault(day, [])
+
+    def add(self, day, number, time, text):
+        # Номера пар и время повторяются у всех преподавателей - храним одну копию строки
+        lesson = Lesson(sys.intern(number), sys.intern(time), text)
+        self.add_lesson(day, lesson)
+        return lesson
+
+    def add_lesson(self, day, lesson):
+        self._days.setdefault(day, []).append(lesson)
+        # Как и раньше, при повторе слота берётся первое занятие
+        self._index.setdefault((day, lesson.number, lesson.time), lesson)
+
+    def lesson_at(self, day, number, time):
+        return self._index.get((day, number, time))
+
+    def slots(self, day):
+        # Все (номер, время) дня в порядке появления на странице
+        return [(lesson.number, lesson.time) for lesson in self._days.get(day, ())]
+
+    def __getitem__(self, day):
+        return self._days[day]
+
+    def __iter__(self):
+        return iter(self._days)
+
+    def __len__(self):
+        return len(self._days)
+
+    def __repr__(self):
+        return f"WeekSchedule({self._days!r})"
+
+    def to_dict(self):
+        return {day: [list(lesson) for lesson in lessons] for day, lessons in self._days.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        week = cls()
+        for day, lessons in data.items():
+            week.add_day(day)
+            for number, time, text in lessons:
+                week.add(day, number, time, text)
+        return week
+
+
+def schedule_to_dict(schedule):
+    # (нечётная, чётная) -> пара словарей для JSON; строка с ошибкой остаётся строкой
+    if isinstance(schedule, tuple):
+        return [week.to_dict() for week in schedule]
+    return schedule
+
+
+def schedule_from_dict(data):
+    if isinstance(data, str):
+        return data
+    return tuple(WeekSchedule.from_dict(week) for week in data)
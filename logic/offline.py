@@ -0,0 +1,243 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, wait
+
+from logic.config import normalize_name, normalize_url
+from logic.fetcher import CANCEL_POLL_SECONDS
+from logic.parser import DEFAULT_BACKEND
+from logic.pipeline import parse_page_timed
+
+ARCHIVE_VERSION = 1
+ARCHIVE_INDEX = "index.json"
+PAGES_DIR = "pages"
+PAGE_EXTENSIONS = (".html", ".htm")
+MISSING_PAGE = "Нет страницы в архиве"
+
+
+def _name_key(name):
+    return normalize_name(name).replace("ё", "е").casefold()
+
+
+def page_file_name(url):
+    return f"{PAGES_DIR}/{hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]}.html"
+
+
+def _decode(data):
+    # Страницы пишутся в utf-8; сохранённые из браузера вручную могут оказаться в cp1251
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1251", errors="replace")
+
+
+class PageArchive:
+    """Сохранённые страницы расписаний: каталог или архив zip/tar.
+
+    Страница преподавателя ищется по ссылке (index.json, который пишет PageArchiveWriter),
+    а если её там нет - по ФИО в имени файла ("Иванов И. И..html", сохранённые из браузера).
+    Чтение - из одного потока.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = None
+        self._tar = None
+        if os.path.isdir(path):
+            members = [os.path.relpath(os.path.join(root, name), path).replace(os.sep, "/")
+                       for root, _, names in os.walk(path) for name in names]
+        elif not os.path.exists(path):
+            raise ValueError(f"Не найден каталог или архив со страницами расписаний: {path}")
+        elif zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            members = self._zip.namelist()
+        elif tarfile.is_tarfile(path):
+            self._tar = tarfile.open(path)
+            members = [member.name for member in self._tar.getmembers() if member.isfile()]
+        else:
+            raise ValueError(f"Ожидается каталог или архив zip/tar со страницами расписаний: {path}")
+
+        self.by_url = {}
+        self.by_name = {}
+        # Архив мог быть упакован вместе с родительским каталогом - index.json ищем на любой глубине
+        index_member = min((m for m in members if m.rsplit("/", 1)[-1] == ARCHIVE_INDEX), key=len, default=None)
+        if index_member is not None:
+            prefix = index_member[:-len(ARCHIVE_INDEX)]
+            try:
+                index = json.loads(self._read(index_member))
+            except ValueError:
+                raise ValueError(f"Повреждён {ARCHIVE_INDEX} в {path}")
+            for url, entry in index.get("pages", {}).items():
+                member = prefix + entry["file"]
+                self.by_url[normalize_url(url)] = member
+                for teacher_name in entry.get("teachers", []):
+                    self.by_name.setdefault(_name_key(teacher_name), member)
+        elif any(re.fullmatch(rf"(?:.*/)?{PAGES_DIR}/[0-9a-f]{{32}}\.html", member) for member in members):
+            # Страницы записал PageArchiveWriter, но index.json нет (сохранение прервалось) - искать их не по чему
+            self.close()
+            raise ValueError(f"В {path} нет {ARCHIVE_INDEX}: сохранение страниц не было завершено, "
+                             f"сохраните их заново (--save-pages)")
+        for member in members:
+            stem, ext = os.path.splitext(member.rsplit("/", 1)[-1])
+            if ext.lower() in PAGE_EXTENSIONS:
+                self.by_name.setdefault(_name_key(stem), member)
+
+    def _read(self, member):
+        if self._zip is not None:
+            return self._zip.read(member)
+        if self._tar is not None:
+            return self._tar.extractfile(member).read()
+        with open(os.path.join(self.path, member), "rb") as f:
+            return f.read()
+
+    def find(self, teacher_name, url):
+        # Имя файла страницы в архиве или None
+        return self.by_url.get(normalize_url(url)) or self.by_name.get(_name_key(teacher_name))
+
+    def read_page(self, member):
+        return _decode(self._read(member))
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PageArchiveWriter:
+    """Дописывает скачанные страницы в каталог или .zip в формате, который читает PageArchive:
+    pages/<хэш ссылки>.html и index.json {ссылка: файл, ФИО}. add() можно вызывать из потоков загрузки,
+    index.json записывается в close()."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+        self.lock = threading.Lock()
+        self._zip = None
+        if path.lower().endswith(".zip"):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(os.path.join(path, PAGES_DIR), exist_ok=True)
+            try:
+                # Повторный запуск в тот же каталог дополняет его, а не затирает прежний индекс
+                with open(os.path.join(path, ARCHIVE_INDEX), "r", encoding="utf-8") as f:
+                    self.pages = json.load(f).get("pages", {})
+            except (OSError, ValueError):
+                pass
+
+    def add(self, url, teacher_names, html):
+        url = normalize_url(url)
+        with self.lock:
+            entry = self.pages.get(url)
+            if entry is None or self._zip is None:
+                entry = {"file": page_file_name(url),
+                         "teachers": entry["teachers"] if entry else [],
+                         "saved": datetime.datetime.now().isoformat(timespec="seconds")}
+                self.pages[url] = entry
+                data = html.encode("utf-8")
+                if self._zip is not None:
+                    self._zip.writestr(entry["file"], data)
+                else:
+                    with open(os.path.join(self.path, entry["file"]), "wb") as f:
+                        f.write(data)
+            for teacher_name in teacher_names:
+                if teacher_name not in entry["teachers"]:
+                    entry["teachers"].append(teacher_name)
+
+    def close(self):
+        index = json.dumps({"version": ARCHIVE_VERSION, "pages": self.pages}, ensure_ascii=False, indent=1)
+        with self.lock:
+            if self._zip is not None:
+                self._zip.writestr(ARCHIVE_INDEX, index)
+                self._zip.close()
+            else:
+                with open(os.path.join(self.path, ARCHIVE_INDEX), "w", encoding="utf-8") as f:
+                    f.write(index)
+
+
+def load_archive_schedules(archive, teachers, pool, backend=DEFAULT_BACKEND, parse_cache=None, callback=None,
+                           max_pending=None, cancel=None):
+    """{ФИО: расписание или текст ошибки} для teachers (записи конфига) по страницам из archive.
+
+    Страницы читаются в текущем потоке, разбор идёт в пуле процессов pool;
+    callback(ФИО, расписание) вызывается по мере готовности.
+    После отмены cancel новые страницы не читаются, и в словаре остаются только готовые ФИО.
+    """
+    max_pending = max_pending or 2 * (os.cpu_count() or 1)
+    results = {}
+
+    def done(teacher_name, schedule):
+        results[teacher_name] = schedule
+        if callback:
+            callback(teacher_name, schedule)
+
+    names_by_member = {}
+    for teacher in teachers:
+        member = archive.find(teacher["фио"], teacher["url"])
+        if member is None:
+            done(teacher["фио"], MISSING_PAGE)
+        else:
+            names_by_member.setdefault(member, []).append(teacher["фио"])
+
+    futures = {}
+
+    def collect(return_when, timeout=None):
+        finished, _ = wait(futures, timeout=timeout, return_when=return_when)
+        for future in finished:
+            html, teacher_names = futures.pop(future)
+            try:
+                page_schedules = {teacher_name: schedule for teacher_name, (schedule, _) in future.result().items()}
+            except Exception as e:
+                page_schedules = {teacher_name: f"Ошибка разбора: {e}" for teacher_name in teacher_names}
+            else:
+                if parse_cache is not None:
+                    for teacher_name, schedule in page_schedules.items():
+                        parse_cache.put(teacher_name, html, backend, schedule)
+            for teacher_name in teacher_names:
+                done(teacher_name, page_schedules[teacher_name])
+
+    for member, teacher_names in names_by_member.items():
+        if cancel is not None and cancel.cancelled:
+            break
+        try:
+            html = archive.read_page(member)
+        except (KeyError, OSError) as e:
+            for teacher_name in teacher_names:
+                done(teacher_name, f"Ошибка чтения архива: {e}")
+            continue
+        pending = []
+        for teacher_name in teacher_names:
+            schedule = parse_cache.get(teacher_name, html, backend) if parse_cache is not None else None
+            if schedule is not None:
+                done(teacher_name, schedule)
+            else:
+                pending.append(teacher_name)
+        if pending:
+            # Не больше max_pending страниц в очереди на разбор, как и в logic.pipeline
+            if len(futures) >= max_pending:
+                collect(FIRST_COMPLETED)
+            futures[pool.submit(parse_page_timed, html, pending, backend)] = (html, pending)
+    while futures:
+        if cancel is None:
+            collect(ALL_COMPLETED)
+        elif cancel.cancelled:
+            break
+        else:
+            collect(FIRST_COMPLETED, timeout=CANCEL_POLL_SECONDS)
+    for future in futures:
+        future.cancel()  # после отмены ещё не начатые разборы снимаются, начатые дорабатывают впустую
+    if parse_cache is not None:
+        parse_cache.prune()
+    return {teacher["фио"]: results[teacher["фио"]] for teacher in teachers if teacher["фио"] in results}
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import threading
+
+from logic.http_cache import CACHE_ROOT
+from logic.model import schedule_to_dict, schedule_from_dict
+from logic.parser import PARSER_FINGERPRINT
+
+
+class ParseCache:
+    """Дисковый кэш результатов parse_schedule.
+
+    Ключ - хэш от версии и движка парсера, ФИО преподавателя (оно влияет на разбор) и текста страницы,
+    поэтому неизменившиеся страницы не разбираются повторно, а правка парсера
+    автоматически делает все старые записи недостижимыми.
+    """
+
+    def __init__(self, directory=None, max_entries=5000):
+        self.directory = directory or os.path.join(CACHE_ROOT, "parsed")
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, teacher_name, html, backend):
+        digest = hashlib.sha256()
+        for part in (PARSER_FINGERPRINT, backend, teacher_name, html):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, teacher_name, html, backend):
+        path = self._path(self.key(teacher_name, html, backend))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)  # отмечаем использование для вытеснения старых записей
+        except (OSError, ValueError):
+            return None
+        return schedule_from_dict(data)
+
+    def put(self, teacher_name, html, backend, schedule):
+        path = self._path(self.key(teacher_name, html, backend))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(schedule_to_dict(schedule), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        # Оставляем max_entries самых недавно использованных записей
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,187 @@
+import hashlib
+import re
+from functools import lru_cache
+from bs4 import BeautifulSoup, NavigableString, Tag, SoupStrainer
+
+from logic.model import WeekSchedule
+
+# Увеличивайте при изменении формата результата разбора. Кроме того, в версию входит
+# хэш исходного кода этого модуля, так что любая правка парсера сбрасывает кэш разобранных страниц.
+PARSER_VERSION = 2
+
+
+def _source_hash():
+    try:
+        with open(__file__, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        # В собранном приложении исходника может не быть - остаётся только PARSER_VERSION
+        return "frozen"
+
+
+PARSER_FINGERPRINT = f"{PARSER_VERSION}:{_source_hash()}"
+
+# Аудитория в тексте занятия: "корп. № 19 ауд. 211", "ауд. 5-14", "Корпус № 3, аудитория 1-01".
+# "ауд" - только отдельным словом и с номером, где есть цифра: не "Аудиторная работа" и не "Баудин А."
+ROOM_PATTERN = re.compile(r'(?:(?<!\w)корп(?:ус)?\.?\s*№?\s*(?P<building>[\w\-/]+)[\s,\-–]*)?'
+                          r'(?<!\w)ауд(?:\.|итория\.?)\s*(?P<room>[\w\-/]*\d[\w\-/]*(?:\.\w+)?)', re.IGNORECASE)
+
+TIMETABLE_STRAINER = SoupStrainer('table', class_='table timetable')
+# Начало таблицы расписания в исходном тексте: всё, что выше, можно не разбирать.
+# Комментарии и <script>/<style> пропускаются целиком - такой же тег внутри них таблицей не считается
+TIMETABLE_START = re.compile(r'<!--(?:.*?-->|.*)|<(script|style)\b(?:.*?</\1\s*>|.*)'
+                             r'|(?P<table><table\b[^>]*\bclass\s*=\s*["\']table timetable["\'])',
+                             re.IGNORECASE | re.DOTALL)
+
+
+def find_table_full(html):
+    # Эталонный способ: полное дерево всей страницы
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.find('table', class_='table timetable')
+
+
+def _timetable_start(html):
+    # Позиция открывающего тега таблицы расписания вне комментариев и скриптов, 0 - если её нет
+    for match in TIMETABLE_START.finditer(html):
+        if match.group("table"):
+            return match.start()
+    return 0
+
+
+def _find_table_strained(html, features):
+    html = html[_timetable_start(html):]
+    # Строим дерево только для таблицы расписания, остальная страница лишь токенизируется
+    soup = BeautifulSoup(html, features, parse_only=TIMETABLE_STRAINER)
+    return soup.find('table', class_='table timetable')
+
+
+def find_table_strainer(html):
+    return _find_table_strained(html, 'html.parser')
+
+
+def find_table_lxml(html):
+    return _find_table_strained(html, 'lxml')
+
+
+PARSER_BACKENDS = {
+    "html.parser": find_table_full,
+    "strainer": find_table_strainer,
+    "lxml": find_table_lxml,
+}
+DEFAULT_BACKEND = "strainer"
+
+
+def available_backends():
+    backends = ["html.parser", "strainer"]
+    try:
+        import lxml  # noqa: F401 - необязательная зависимость
+        backends.append("lxml")
+    except ImportError:
+        pass
+    return backends
+
+
+def extract_text_with_commas_and_breaks(td, teacher_name):
+    result = []
+    group_names = []
+    group_set = set()
+    current_line = []
+    coun_br = 0
+    for elem in td.contents:
+        if isinstance(elem, NavigableString):
+            text_ = elem.strip()
+            if text_ and text_ != ',':
+                current_line.append(text_)
+        elif isinstance(elem, Tag):
+            if elem.name == "br":
+                coun_br += 1
+                if current_line:
+                    line = ' '.join(current_line).strip()
+                    if line:
+                        result.append(line)
+                    current_line = []
+            elif elem.name == "a" and "e.sfu-kras.ru" in elem.get("href", ""):
+                result.append(elem.get("href"))
+            else:
+                text_ = elem.get_text(strip=True)
+                if "подгруппа" in text_:
+                    base_name = text_
+                    if base_name not in group_set:
+                        group_set.add(base_name)
+                        group_names.append(base_name)
+                elif coun_br == 0:
+                    group_set.add(text_)
+                    group_names.append(text_)
+                else:
+                    current_line.append(text_)
+
+    if current_line:
+        line = ' '.join(current_line).strip()
+        if line:
+            result.append(line)
+    if len(result) > 2 and not (result[-2].lower().strip() == "эиос"):
+        result.pop(-1)
+    output = ''
+    if group_names:
+        output += ', '.join(group_names)
+    if result:
+        if output:
+            output += '\n'
+        output += '\n'.join(result)
+    output = output.replace(teacher_name + "\n", "")
+    output = output.replace("ЭИОС\n", "ЭИОС, ")
+    return output.strip()
+
+
+def parse_schedule(html, teacher_name, backend=DEFAULT_BACKEND):
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Неизвестный парсер: {backend}")
+    table = PARSER_BACKENDS[backend](html)
+    if table is None:
+        return "Таблица не найдена!"
+    rows = table.find_all('tr')
+    if len(rows) == 0:
+        return "Неправильная ссылка на расписание"
+    if teacher_name[-1] != "." or teacher_name not in html:
+        return "Неправильное имя преподавателя"
+
+    odd_week_schedule = WeekSchedule()
+    even_week_schedule = WeekSchedule()
+    current_heading = None
+    for row in rows:
+        if "heading-section" in row.get("class", []):
+            current_heading = row.get_text(separator=' ', strip=True)
+            odd_week_schedule.add_day(current_heading)
+            even_week_schedule.add_day(current_heading)
+        if "table-center" in row.get("class", []):
+            tds = row.find_all("td")
+            if len(tds) > 3:
+                num_of_lesson = tds[0].get_text(separator=' ', strip=True)
+                time_of_lesson = tds[1].get_text(separator=' ', strip=True)
+                text_odd = extract_text_with_commas_and_breaks(tds[2], teacher_name).strip()
+                text_even = extract_text_with_commas_and_breaks(tds[3], teacher_name).strip()
+                odd_week_schedule.add(current_heading, num_of_lesson, time_of_lesson, text_odd)
+                even_week_schedule.add(current_heading, num_of_lesson, time_of_lesson, text_even)
+            elif len(tds) == 3:
+                num_of_lesson = tds[0].get_text(separator=' ', strip=True)
+                time_of_lesson = tds[1].get_text(separator=' ', strip=True)
+                text = extract_text_with_commas_and_breaks(tds[2], teacher_name).strip()
+                # Занятие на обе недели - один и тот же объект в обеих
+                lesson = odd_week_schedule.add(current_heading, num_of_lesson, time_of_lesson, text)
+                even_week_schedule.add_lesson(current_heading, lesson)
+
+    return (odd_week_schedule, even_week_schedule)
+
+
+@lru_cache(maxsize=65536)
+def extract_room(text):
+    """Аудитория занятия в едином виде ("корп. № 19 ауд. 211" или "ауд. 5") или None,
+    если её нет (занятие в ЭИОС, пустая ячейка). Ищется с последней строки - там обычно место."""
+    for line in reversed(text.split("\n")):
+        match = ROOM_PATTERN.search(line)
+        if match:
+            room = f"ауд. {match.group('room')}"
+            if match.group("building"):
+                room = f"корп. № {match.group('building')} {room}"
+            return room
+    return None
@@ -0,0 +1,107 @@
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from logic.cancel import LoadCancelled
+from logic.fetcher import DEFAULT_MAX_WORKERS, CANCEL_POLL_SECONDS
+from logic.parser import parse_schedule, DEFAULT_BACKEND
+
+_CANCELLED = object()
+
+
+class ParseTask(namedtuple("ParseTask", ["args", "finish"])):
+    # Страница скачана, но её нужно разобрать: parse(*args) в пуле процессов, затем finish(результат разбора)
+    __slots__ = ()
+
+
+def parse_page_timed(html, teacher_names, backend=DEFAULT_BACKEND):
+    # Выполняется в процессе пула: {ФИО: (расписание, секунды разбора)} для всех ФИО, ссылающихся на страницу
+    parsed = {}
+    for teacher_name in teacher_names:
+        start = time.perf_counter()
+        schedule = parse_schedule(html, teacher_name, backend=backend)
+        parsed[teacher_name] = (schedule, time.perf_counter() - start)
+    return parsed
+
+
+def fetch_parse_pipeline(jobs, fetch, parse, pool, max_workers=DEFAULT_MAX_WORKERS, max_pending=None,
+                         callback=None, cancel=None):
+    """Конвейер "скачивание -> разбор": fetch(*args) для jobs = [(key, args), ...] выполняется
+    в max_workers потоках, а разбор страниц - в пуле процессов pool, пока идут следующие загрузки.
+
+    fetch возвращает готовый результат или ParseTask. Очередь на разбор ограничена max_pending
+    страницами (по умолчанию - по две на ядро): когда она заполнена, потоки загрузки ждут,
+    поэтому в памяти одновременно не больше max_workers + max_pending страниц при любом размере конфига.
+    Как и в fetch_concurrently, callback(key, result) вызывается в вызывающем потоке по мере готовности,
+    словарь упорядочен как jobs, а после отмены cancel в нём остаются только готовые ключи.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return {}
+    slots = threading.BoundedSemaphore(max_pending or 2 * (os.cpu_count() or 1))
+    done_queue = queue.SimpleQueue()  # (key, результат | future разбора, finish | None)
+
+    def fetch_stage(key, args):
+        try:
+            result = fetch(*args)
+        except LoadCancelled:
+            done_queue.put((key, _CANCELLED, None))
+            return
+        except Exception as e:
+            done_queue.put((key, f"Ошибка загрузки: {e}", None))
+            return
+        if not isinstance(result, ParseTask):
+            done_queue.put((key, result, None))
+            return
+        while not slots.acquire(timeout=CANCEL_POLL_SECONDS):
+            if cancel is not None and cancel.cancelled:
+                done_queue.put((key, _CANCELLED, None))
+                return
+        try:
+            future = pool.submit(parse, *result.args)
+        except Exception as e:  # пул остановлен или сломан
+            slots.release()
+            done_queue.put((key, f"Ошибка разбора: {e}", None))
+            return
+
+        def on_parsed(future):
+            slots.release()
+            done_queue.put((key, future, result.finish))
+        future.add_done_callback(on_parsed)
+
+    results = {}
+    remaining = len(jobs)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+    try:
+        for key, args in jobs:
+            executor.submit(fetch_stage, key, args)
+        while remaining:
+            if cancel is not None and cancel.cancelled:
+                break
+            try:
+                key, result, finish = done_queue.get(timeout=CANCEL_POLL_SECONDS if cancel is not None else None)
+            except queue.Empty:
+                continue
+            remaining -= 1
+            if result is _CANCELLED:
+                continue
+            if finish is not None:
+                try:
+                    parsed = result.result()
+                except Exception as e:
+                    result = f"Ошибка разбора: {e}"
+                else:
+                    try:
+                        result = finish(parsed)
+                    except LoadCancelled:
+                        continue  # отменили, пока страница разбиралась
+            results[key] = result
+            if callback:
+                callback(key, result)
+    finally:
+        # При отмене ещё не начатые загрузки снимаются, а запущенные дорабатывают в фоне без ожидания
+        executor.shutdown(wait=not remaining, cancel_futures=True)
+    return {key: results[key] for key, _ in jobs if key in results}
@@ -0,0 +1,111 @@
+import numpy as np
+
+from logic.builder import DAYS_ORDER
+from logic.slots import WEEKS, SlotIndex
+
+UTILIZATION_SHEET = "Загрузка аудиторий"
+SLOT_UTILIZATION_SHEET = "Загрузка по парам"
+CONFLICTS_SHEET = "Конфликты аудиторий"
+
+
+class RoomIndex:
+    """Занятость аудиторий по уже загруженным расписаниям: аудитория -> занятые слоты.
+
+    Матрица [аудитория, неделя, день, номер пары] строится за один проход по занятиям,
+    проценты загрузки считаются по ней векторно. Конфликт - в одной аудитории в один слот
+    разные занятия (одно и то же занятие у нескольких преподавателей конфликтом не считается).
+    """
+
+    def __init__(self, teachers_schedule):
+        # Номера пар и время берём из индекса слотов, чтобы оси совпадали
+        slots = SlotIndex(teachers_schedule)
+        self.numbers = slots.numbers
+        self.times = slots.times
+        number_positions = {number: i for i, number in enumerate(self.numbers)}
+        day_positions = {day: i for i, day in enumerate(DAYS_ORDER)}
+
+        occupied = {}  # (аудитория, неделя, день, номер) -> {текст занятия: [ФИО]}
+        for teacher, schedule in teachers_schedule.items():
+            if not isinstance(schedule, tuple):
+                continue
+            for week_idx, week in enumerate(schedule):
+                for day, lessons in week.items():
+                    day_idx = day_positions.get(day)
+                    if day_idx is None:
+                        continue
+                    for lesson in lessons:
+                        number_idx = number_positions.get(int(lesson.number)) if lesson.number.isdigit() else None
+                        room = lesson.room
+                        if room is None or number_idx is None:
+                            continue
+                        occupied.setdefault((room, week_idx, day_idx, number_idx), {}) \
+                            .setdefault(lesson.text, []).append(teacher)
+
+        self.rooms = sorted({key[0] for key in occupied})
+        room_positions = {room: i for i, room in enumerate(self.rooms)}
+        self.busy = np.zeros((len(self.rooms), len(WEEKS), len(DAYS_ORDER), len(self.numbers)), dtype=bool)
+        self.conflicts = []
+        for (room, week_idx, day_idx, number_idx), lessons in occupied.items():
+            self.busy[room_positions[room], week_idx, day_idx, number_idx] = True
+            if len(lessons) > 1:
+                day = DAYS_ORDER[day_idx]
+                number = self.numbers[number_idx]
+                self.conflicts.append((WEEKS[week_idx], day, number,
+                                       self.times.get((day, number), self.times.get(number, "")), room, lessons))
+        self.conflicts.sort(key=lambda c: (WEEKS.index(c[0]), DAYS_ORDER.index(c[1]), c[2], c[4]))
+        self.occupied = occupied
+
+    def room_slots(self, room):
+        # Занятые слоты аудитории: [(неделя, день, номер, время, [ФИО]), ...]
+        if room not in self.rooms:
+            return []
+        row = self.busy[self.rooms.index(room)]
+        result = []
+        for week_idx, day_idx, number_idx in zip(*np.nonzero(row)):
+            day = DAYS_ORDER[day_idx]
+            number = self.numbers[number_idx]
+            teachers = sum(self.occupied[(room, week_idx, day_idx, number_idx)].values(), [])
+            result.append((WEEKS[week_idx], day, number, self.times.get((day, number), self.times.get(number, "")),
+                           teachers))
+        return result
+
+    def utilization_by_day(self):
+        # Процент занятых слотов аудитории по дням (обе недели): {аудитория: [пн, ..., сб, всего]}
+        slots_per_day = len(WEEKS) * max(len(self.numbers), 1)
+        by_day = self.busy.sum(axis=(1, 3)) * 100.0 / slots_per_day
+        total = by_day.mean(axis=1)
+        return {room: [round(float(value), 1) for value in by_day[i]] + [round(float(total[i]), 1)]
+                for i, room in enumerate(self.rooms)}
+
+    def utilization_by_slot(self):
+        # Процент занятых аудиторий в каждый слот: [(день, номер, время, % нечётная, % чётная), ...]
+        if not self.rooms:
+            return []
+        share = self.busy.mean(axis=0) * 100.0
+        rows = []
+        for day_idx, day in enumerate(DAYS_ORDER):
+            for number_idx, number in enumerate(self.numbers):
+                rows.append((day, number, self.times.get((day, number), self.times.get(number, "")),
+                             round(float(share[0, day_idx, number_idx]), 1),
+                             round(float(share[1, day_idx, number_idx]), 1)))
+        return rows
+
+
+def save_room_workbook(file_path, index):
+    """Книга с загрузкой аудиторий (по дням и по парам) и списком двойных бронирований."""
+    from logic.export import ScheduleWorkbookWriter
+    if not index.rooms:
+        raise ValueError("Нет аудиторий", "В загруженных расписаниях не найдено ни одной аудитории.")
+    writer = ScheduleWorkbookWriter()
+    utilization = index.utilization_by_day()
+    writer.write_table_sheet(UTILIZATION_SHEET, ["Аудитория"] + [f"{day}, %" for day in DAYS_ORDER] + ["Всего, %"],
+                             [[room] + values for room, values in utilization.items()])
+    writer.write_table_sheet(SLOT_UTILIZATION_SHEET, ["День", "№", "Время", "Нечётная неделя, %", "Чётная неделя, %"],
+                             [list(row) for row in index.utilization_by_slot()])
+    conflict_rows = []
+    for week, day, number, time, room, lessons in index.conflicts:
+        for text, teachers in lessons.items():
+            conflict_rows.append([week, day, number, time, room, ", ".join(teachers), text])
+    writer.write_table_sheet(CONFLICTS_SHEET, ["Неделя", "День", "№", "Время", "Аудитория", "Преподаватели", "Занятие"],
+                             conflict_rows)
+    writer.save(file_path)
@@ -0,0 +1,96 @@
+import numpy as np
+
+from logic.builder import DAYS_ORDER
+
+WEEKS = ["Нечётная", "Чётная"]
+
+
+def _lesson_number(number):
+    try:
+        return int(number)
+    except ValueError:
+        return None
+
+
+class SlotIndex:
+    """Занятость преподавателей как булева матрица [преподаватель, неделя, день, номер пары].
+
+    Строится один раз по teachers_schedule; запросы по любому набору преподавателей -
+    векторные операции над строками матрицы, без повторного прохода по занятиям.
+    """
+
+    def __init__(self, teachers_schedule):
+        schedules = {name: schedule for name, schedule in teachers_schedule.items() if isinstance(schedule, tuple)}
+        self.teachers = list(schedules)
+        self.positions = {name: i for i, name in enumerate(self.teachers)}
+
+        numbers = set()
+        self.times = {}  # (день, номер) и номер -> время пары, как на сайте
+        for schedule in schedules.values():
+            for week in schedule:
+                for day, lessons in week.items():
+                    for lesson in lessons:
+                        number = _lesson_number(lesson.number)
+                        if number is not None:
+                            numbers.add(number)
+                            self.times.setdefault((day, number), lesson.time)
+                            self.times.setdefault(number, lesson.time)  # если в этот день пары не было
+        self.numbers = sorted(numbers)
+        number_positions = {number: i for i, number in enumerate(self.numbers)}
+        day_positions = {day: i for i, day in enumerate(DAYS_ORDER)}
+
+        self.busy = np.zeros((len(self.teachers), len(WEEKS), len(DAYS_ORDER), len(self.numbers)), dtype=bool)
+        for teacher, schedule in schedules.items():
+            row = self.busy[self.positions[teacher]]
+            for week_idx, week in enumerate(schedule):
+                for day, lessons in week.items():
+                    day_idx = day_positions.get(day)
+                    if day_idx is None:
+                        continue
+                    for lesson in lessons:
+                        number = _lesson_number(lesson.number)
+                        if number is not None and lesson.text.strip():
+                            row[week_idx, day_idx, number_positions[number]] = True
+
+    def _rows(self, teacher_names):
+        unknown = [name for name in teacher_names if name not in self.positions]
+        if unknown:
+            raise ValueError("Нет загруженного расписания: " + ", ".join(unknown))
+        return self.busy[[self.positions[name] for name in teacher_names]]
+
+    def _slot(self, week_idx, day_idx, number_idx):
+        day = DAYS_ORDER[day_idx]
+        number = self.numbers[number_idx]
+        return WEEKS[week_idx], day, number, self.times.get((day, number), self.times.get(number, ""))
+
+    def busy_counts(self, teacher_names):
+        # Сколько из выбранных преподавателей занято в каждом слоте: [неделя, день, пара]
+        return self._rows(teacher_names).sum(axis=0)
+
+    def common_free(self, teacher_names, weeks=(0, 1), both_weeks=False):
+        """Слоты, где свободны все выбранные: [(неделя, день, номер, время), ...].
+        both_weeks=True - свободно и в нечётную, и в чётную неделю (неделя в ответе "Обе")."""
+        busy = self._rows(teacher_names).any(axis=0)
+        if both_weeks:
+            free = ~busy.any(axis=0)
+            return [("Обе",) + self._slot(0, day_idx, number_idx)[1:] for day_idx, number_idx in zip(*np.nonzero(free))]
+        free = ~busy
+        return [self._slot(week_idx, day_idx, number_idx)
+                for week_idx, day_idx, number_idx in zip(*np.nonzero(free)) if week_idx in weeks]
+
+    def overlaps(self, teacher_names, weeks=(0, 1)):
+        # Слоты, где заняты двое и больше из выбранных: [(неделя, день, номер, время, [ФИО]), ...]
+        rows = self._rows(teacher_names)
+        result = []
+        for week_idx, day_idx, number_idx in zip(*np.nonzero(rows.sum(axis=0) >= 2)):
+            if week_idx in weeks:
+                names = [teacher_names[i] for i in np.nonzero(rows[:, week_idx, day_idx, number_idx])[0]]
+                result.append(self._slot(week_idx, day_idx, number_idx) + (names,))
+        return result
+
+    def free_teachers(self, week, day, number):
+        # Кто из всех загруженных свободен в указанный слот
+        if day not in DAYS_ORDER or number not in self.numbers:
+            return list(self.teachers)
+        column = self.busy[:, WEEKS.index(week), DAYS_ORDER.index(day), self.numbers.index(number)]
+        return [self.teachers[i] for i in np.nonzero(~column)[0]]
@@ -0,0 +1,144 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from logic.http_cache import CACHE_ROOT
+from logic.model import schedule_to_dict
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".json.gz"
+CHANGES_SHEET = "Изменения"
+CHANGE_KINDS = {"added": "добавлено", "removed": "удалено", "changed": "изменено", "status": "статус"}
+WEEK_NAMES = ["Нечётная", "Чётная"]
+
+
+def snapshot_data(teachers_schedule, config=None):
+    return {
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "teachers": {name: schedule_to_dict(schedule) for name, schedule in teachers_schedule.items()},
+    }
+
+
+class SnapshotStore:
+    """Сжатые снимки разобранных расписаний по запускам: <конфиг>-<хэш пути>-<дата-время>.json.gz.
+
+    Для каждого конфига хранится не больше max_per_config последних снимков.
+    """
+
+    def __init__(self, directory=None, max_per_config=50):
+        self.directory = directory or os.path.join(CACHE_ROOT, "snapshots")
+        self.max_per_config = max_per_config
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _prefix(self, config):
+        if not config:
+            return "snapshot-"
+        # Имя файла - для читаемости, хэш полного пути - чтобы одноимённые конфиги разных
+        # подразделений не делили историю (тот же ключ, что у запусков в logic.store)
+        name = re.sub(r'[<>:"/\\|?*\s]', "_", os.path.splitext(os.path.basename(config))[0])
+        digest = hashlib.sha256(os.path.abspath(config).encode("utf-8")).hexdigest()[:8]
+        return f"{name}-{digest}-"
+
+    def save(self, teachers_schedule, config=None):
+        data = snapshot_data(teachers_schedule, config)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.directory, self._prefix(config) + stamp + SNAPSHOT_SUFFIX)
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        self.prune(config)
+        return path
+
+    def list(self, config=None):
+        # Снимки конфига от старых к новым (имена сортируются по времени)
+        prefix = self._prefix(config)
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name.endswith(SNAPSHOT_SUFFIX)
+                      and re.fullmatch(r"\d{8}-\d{6}-\d{6}", name[len(prefix):-len(SNAPSHOT_SUFFIX)]))
+
+    def previous(self, config=None, before=None):
+        # Последний снимок конфига, сделанный раньше before (путь к снимку), или None
+        snapshots = self.list(config)
+        if before in snapshots:
+            snapshots = snapshots[:snapshots.index(before)]
+        return snapshots[-1] if snapshots else None
+
+    def prune(self, config=None):
+        for path in self.list(config)[:-self.max_per_config]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_snapshot(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия снимка: {path}")
+    return data
+
+
+def _cells(schedule):
+    # {(неделя, день, номер, время): текст} только для непустых занятий
+    cells = {}
+    for week_idx, week in enumerate(schedule):
+        for day, lessons in week.items():
+            for number, time, text in lessons:
+                if text.strip():
+                    cells.setdefault((WEEK_NAMES[week_idx], day, number, time), text)
+    return cells
+
+
+def diff_snapshots(old, new):
+    """Изменившиеся ячейки между двумя снимками (данные снимков, а не книги):
+    [{"teacher", "kind", "week", "day", "number", "time", "old", "new"}, ...].
+    kind: added / removed / changed, либо status, если у преподавателя сменился статус загрузки
+    (тогда ячейки не сравниваются - одна из сторон неизвестна)."""
+    changes = []
+    old_teachers = old["teachers"]
+    new_teachers = new["teachers"]
+    names = list(old_teachers) + [name for name in new_teachers if name not in old_teachers]
+    for name in names:
+        old_schedule = old_teachers.get(name)
+        new_schedule = new_teachers.get(name)
+        if isinstance(old_schedule, str) or isinstance(new_schedule, str):
+            old_status = "нет в снимке" if old_schedule is None else old_schedule if isinstance(old_schedule, str) else "ok"
+            new_status = "нет в снимке" if new_schedule is None else new_schedule if isinstance(new_schedule, str) else "ok"
+            if old_status != new_status:
+                changes.append({"teacher": name, "kind": "status", "week": None, "day": None, "number": None,
+                                "time": None, "old": old_status, "new": new_status})
+            continue
+        old_cells = _cells(old_schedule) if old_schedule is not None else {}
+        new_cells = _cells(new_schedule) if new_schedule is not None else {}
+        if old_cells == new_cells:
+            continue
+        for key in list(old_cells) + [key for key in new_cells if key not in old_cells]:
+            before = old_cells.get(key)
+            after = new_cells.get(key)
+            if before == after:
+                continue
+            kind = "added" if before is None else "removed" if after is None else "changed"
+            week, day, number, time = key
+            changes.append({"teacher": name, "kind": kind, "week": week, "day": day, "number": number,
+                            "time": time, "old": before, "new": after})
+    return changes
+
+
+def save_diff(base_path, changes, old_path=None, new_path=None):
+    """<base_path>.diff.json (машиночитаемый) и <base_path>.changes.xlsx (лист "Изменения")."""
+    from logic.export import ScheduleWorkbookWriter
+    json_path = base_path + ".diff.json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"old": old_path, "new": new_path, "changes": changes}, f, ensure_ascii=False, indent=2)
+    xlsx_path = base_path + ".changes.xlsx"
+    writer = ScheduleWorkbookWriter()
+    writer.write_table_sheet(CHANGES_SHEET, ["Преподаватель", "Изменение", "Неделя", "День", "№", "Время", "Было", "Стало"],
+                             [[c["teacher"], CHANGE_KINDS[c["kind"]], c["week"], c["day"], c["number"], c["time"],
+                               c["old"], c["new"]] for c in changes])
+    writer.save(xlsx_path)
+    return json_path, xlsx_path
@@ -0,0 +1,209 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from logic.groups import split_lesson
+from logic.http_cache import CACHE_ROOT
+from logic.model import WeekSchedule
+from logic.slots import WEEKS
+
+SCHEMA_VERSION = 1
+MISSING_IN_RUN = "Нет в сохранённом запуске"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    config TEXT,
+    source TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS teachers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    UNIQUE (name, url)
+);
+-- Исход загрузки каждого преподавателя в запуске: status "ok" или текст ошибки
+CREATE TABLE IF NOT EXISTS fetches (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    teacher_id INTEGER NOT NULL REFERENCES teachers(id),
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts TEXT NOT NULL,
+    fetched_at REAL,
+    PRIMARY KEY (run_id, teacher_id)
+);
+-- Дни недели в порядке страницы, в том числе без занятий
+CREATE TABLE IF NOT EXISTS days (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    teacher_id INTEGER NOT NULL REFERENCES teachers(id),
+    week INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (run_id, teacher_id, week, position)
+);
+-- week: 0 - нечётная, 1 - чётная; пустые слоты тоже хранятся, чтобы расписание восстанавливалось как было
+CREATE TABLE IF NOT EXISTS lessons (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    teacher_id INTEGER NOT NULL REFERENCES teachers(id),
+    week INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    number TEXT NOT NULL,
+    time TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lesson_groups (
+    lesson_id INTEGER NOT NULL REFERENCES lessons(id) ON DELETE CASCADE,
+    group_name TEXT NOT NULL,
+    subgroup TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_config ON runs (config, created);
+CREATE INDEX IF NOT EXISTS fetches_teacher ON fetches (teacher_id, run_id);
+CREATE INDEX IF NOT EXISTS lessons_teacher ON lessons (teacher_id, run_id, week, day);
+CREATE INDEX IF NOT EXISTS lessons_slot ON lessons (run_id, week, day, number);
+CREATE INDEX IF NOT EXISTS lesson_groups_group ON lesson_groups (group_name, lesson_id);
+CREATE INDEX IF NOT EXISTS lesson_groups_lesson ON lesson_groups (lesson_id);
+-- Для запросов руками: непустые занятия со всеми подписями
+CREATE VIEW IF NOT EXISTS schedule AS
+SELECT runs.id AS run_id, runs.config, runs.created, teachers.name AS teacher,
+       CASE lessons.week WHEN 0 THEN 'Нечётная' ELSE 'Чётная' END AS week,
+       lessons.day, lessons.number, lessons.time, lessons.text, lessons.id AS lesson_id
+FROM lessons
+JOIN runs ON runs.id = lessons.run_id
+JOIN teachers ON teachers.id = lessons.teacher_id
+WHERE lessons.text <> '';
+"""
+
+
+class ScheduleStore:
+    """Загруженные расписания в SQLite: каждый запуск (загрузка с сайта, из архива, частичное обновление)
+    сохраняется целиком одной транзакцией, поэтому приложение может собрать таблицу после перезапуска
+    без сети, а история по запускам и семестрам доступна обычным SQL (см. представление schedule).
+
+    Как и в SnapshotStore, для каждого конфига хранится не больше max_per_config последних запусков.
+    """
+
+    def __init__(self, path=None, max_per_config=50):
+        self.path = path or os.path.join(CACHE_ROOT, "schedules.sqlite3")
+        self.max_per_config = max_per_config
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Загрузки идут в фоновых потоках окна - одно соединение на всех, под замком
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def save_run(self, teachers, teachers_schedule, fetch_attempts=None, fetched_at=None, config=None, source="сайт"):
+        """Сохраняет состояние загрузки (записи конфига и {ФИО: расписание или ошибка}), возвращает id запуска."""
+        fetch_attempts = fetch_attempts or {}
+        fetched_at = fetched_at or {}
+        urls = {teacher["фио"]: teacher["url"] for teacher in teachers}
+        names = [teacher["фио"] for teacher in teachers if teacher["фио"] in teachers_schedule]
+        names += [name for name in teachers_schedule if name not in urls]
+        with self.lock, self.connection:
+            run_id = self.connection.execute("INSERT INTO runs (config, source, created) VALUES (?, ?, ?)",
+                                             (config, source, time.time())).lastrowid
+            self.connection.executemany("INSERT OR IGNORE INTO teachers (name, url) VALUES (?, ?)",
+                                        [(name, urls.get(name, "")) for name in names])
+            teacher_ids = {(name, url): teacher_id for teacher_id, name, url
+                           in self.connection.execute("SELECT id, name, url FROM teachers")}
+            # id занятий раздаём сами, чтобы группы записать тем же пакетом (запись уже заблокирована INSERT в runs)
+            lesson_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM lessons").fetchone()[0]
+            fetch_rows, day_rows, lesson_rows, group_rows = [], [], [], []
+            for position, name in enumerate(names):
+                teacher_id = teacher_ids[(name, urls.get(name, ""))]
+                schedule = teachers_schedule[name]
+                status = "ok" if isinstance(schedule, tuple) else schedule
+                fetch_rows.append((run_id, teacher_id, position, status,
+                                   json.dumps(fetch_attempts.get(name, []), ensure_ascii=False), fetched_at.get(name)))
+                if not isinstance(schedule, tuple):
+                    continue
+                for week_idx, week in enumerate(schedule):
+                    for day_position, (day, lessons) in enumerate(week.items()):
+                        day_rows.append((run_id, teacher_id, week_idx, day_position, day))
+                        for lesson_position, lesson in enumerate(lessons):
+                            lesson_id += 1
+                            lesson_rows.append((lesson_id, run_id, teacher_id, week_idx, day, lesson_position,
+                                                lesson.number, lesson.time, lesson.text))
+                            if lesson.text.strip():
+                                groups, _ = split_lesson(lesson.text)
+                                group_rows.extend((lesson_id, group, subgroup) for group, subgroup in groups)
+            self.connection.executemany("INSERT INTO fetches VALUES (?, ?, ?, ?, ?, ?)", fetch_rows)
+            self.connection.executemany("INSERT INTO days VALUES (?, ?, ?, ?, ?)", day_rows)
+            self.connection.executemany("INSERT INTO lessons VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", lesson_rows)
+            self.connection.executemany("INSERT INTO lesson_groups VALUES (?, ?, ?)", group_rows)
+            self._prune(config)
+        return run_id
+
+    def _prune(self, config):
+        # Вызывается в транзакции save_run: старые запуски удаляются вместе с новым, одной записью на диск
+        self.connection.execute(
+            "DELETE FROM runs WHERE config IS ? AND id NOT IN "
+            "(SELECT id FROM runs WHERE config IS ? ORDER BY created DESC, id DESC LIMIT ?)",
+            (config, config, self.max_per_config))
+        self.connection.execute("DELETE FROM teachers WHERE id NOT IN (SELECT teacher_id FROM fetches)")
+
+    def runs(self, config=None):
+        # Запуски от новых к старым: [{"id", "config", "source", "created", "teachers", "ok"}, ...]
+        sql = ("SELECT runs.id, runs.config, runs.source, runs.created, COUNT(fetches.teacher_id), "
+               "SUM(fetches.status = 'ok') FROM runs LEFT JOIN fetches ON fetches.run_id = runs.id")
+        params = ()
+        if config is not None:
+            sql += " WHERE runs.config = ?"
+            params = (config,)
+        sql += " GROUP BY runs.id ORDER BY runs.created DESC, runs.id DESC"
+        columns = ["id", "config", "source", "created", "teachers", "ok"]
+        return [dict(zip(columns, row)) for row in self.query(sql, params)]
+
+    def latest_run(self, config=None):
+        # Последний запуск, в котором загрузилось хоть одно расписание: сплошь ошибочный (сайт или архив
+        # недоступны) не должен заслонять прежние данные
+        return next((run["id"] for run in self.runs(config) if run["ok"]), None)
+
+    def load_run(self, run_id):
+        """(записи конфига, {ФИО: расписание или ошибка}, {ФИО: попытки}, {ФИО: время загрузки}) запуска run_id."""
+        fetches = self.query(
+            "SELECT teachers.id, teachers.name, teachers.url, fetches.status, fetches.attempts, fetches.fetched_at "
+            "FROM fetches JOIN teachers ON teachers.id = fetches.teacher_id "
+            "WHERE fetches.run_id = ? ORDER BY fetches.position", (run_id,))
+        if not fetches:
+            raise ValueError("Нет сохранённых расписаний", f"Запуск {run_id} не найден в {self.path}")
+        weeks = {}
+        for teacher_id, week_idx, day in self.query(
+                "SELECT teacher_id, week, day FROM days WHERE run_id = ? ORDER BY teacher_id, week, position", (run_id,)):
+            weeks.setdefault((teacher_id, week_idx), WeekSchedule()).add_day(day)
+        for teacher_id, week_idx, day, number, time_text, text in self.query(
+                "SELECT teacher_id, week, day, number, time, text FROM lessons WHERE run_id = ? "
+                "ORDER BY teacher_id, week, day, position", (run_id,)):
+            weeks[(teacher_id, week_idx)].add(day, number, time_text, text)
+        teachers, teachers_schedule, fetch_attempts, fetched_at = [], {}, {}, {}
+        for teacher_id, name, url, status, attempts, fetched in fetches:
+            teachers.append({"фио": name, "url": url})
+            if status == "ok":
+                teachers_schedule[name] = tuple(weeks.get((teacher_id, week_idx), WeekSchedule())
+                                                for week_idx in range(len(WEEKS)))
+            else:
+                teachers_schedule[name] = status
+            fetch_attempts[name] = json.loads(attempts)
+            if fetched is not None:
+                fetched_at[name] = fetched
+        return teachers, teachers_schedule, fetch_attempts, fetched_at
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def delete_run(self, run_id):
+        # Занятия, дни, исходы загрузки и группы удаляются каскадом
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
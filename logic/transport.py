@@ -0,0 +1,115 @@
+import random
+import time
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from logic.cancel import LoadCancelled
+from logic.fetcher import DEFAULT_MAX_WORKERS
+
+# Сайт расписания открывается без проверки сертификата (verify=False),
+# поэтому не засоряем вывод предупреждением на каждый запрос
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class FetchError(Exception):
+    def __init__(self, message, attempts):
+        super().__init__(f"{message} ({format_attempts(attempts)})")
+        self.attempts = attempts
+
+
+def format_attempts(attempts):
+    # ["503", "таймаут", "200"] -> "попытки: 503 → таймаут → 200"
+    return "попытки: " + " → ".join(attempts)
+
+
+class HttpTransport:
+    """Общий для всех преподавателей HTTP-клиент: пул keep-alive соединений,
+    таймауты на подключение/чтение и повторы с экспоненциальной задержкой."""
+
+    def __init__(self, pool_size=DEFAULT_MAX_WORKERS, connect_timeout=5, read_timeout=30,
+                 retries=3, backoff_base=0.5, backoff_max=8.0, verify=False, cache=None):
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.verify = verify
+        self.session = requests.Session()
+        # Повторы делаем сами, чтобы видеть исход каждой попытки
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def backoff(self, attempt):
+        # "Full jitter": случайная пауза от 0 до base * 2^attempt, но не больше backoff_max
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request_timeout(self, cancel=None):
+        # Таймауты запроса не дольше, чем осталось до общего срока загрузки
+        remaining = cancel.remaining() if cancel is not None else None
+        if remaining is None:
+            return self.timeout
+        remaining = max(remaining, 0.1)
+        return min(self.timeout[0], remaining), min(self.timeout[1], remaining)
+
+    def get(self, url, headers=None, cancel=None):
+        """Возвращает (response, attempts), где attempts - исходы всех попыток.
+        Повторяет запрос при 5xx и сетевых ошибках, иначе бросает FetchError.
+        После отмены cancel (logic.cancel.CancelToken) новых попыток нет - LoadCancelled."""
+        attempts = []
+        for attempt in range(self.retries + 1):
+            if attempt:
+                if cancel is None:
+                    time.sleep(self.backoff(attempt - 1))
+                elif cancel.wait(self.backoff(attempt - 1)):
+                    raise LoadCancelled(cancel.reason)
+            if cancel is not None:
+                cancel.check()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.request_timeout(cancel),
+                                            verify=self.verify)
+            except requests.Timeout:
+                attempts.append("таймаут")
+                continue
+            except requests.ConnectionError:
+                attempts.append("нет соединения")
+                continue
+            attempts.append(str(response.status_code))
+            if response.status_code < 500:
+                return response, attempts
+        raise FetchError("Сайт расписания не отвечает", attempts)
+
+    def fetch(self, url, use_cache=True, revalidate=False, cancel=None):
+        """Возвращает (text, attempts) с учётом дискового кэша: свежая запись отдаётся
+        без сети ("кэш"), устаревшая перепроверяется условным GET ("304").
+        revalidate=True перепроверяет запись, даже если она ещё свежая."""
+        cached = self.cache.get(url) if self.cache is not None and use_cache else None
+        if cached is not None:
+            text, meta = cached
+            if not revalidate and self.cache.is_fresh(meta):
+                return text, ["кэш"]
+            headers = self.cache.conditional_headers(meta)
+        else:
+            headers = None
+        try:
+            response, attempts = self.get(url, headers=headers, cancel=cancel)
+        except FetchError as e:
+            if cached is None:
+                raise
+            # Сайт недоступен, но есть сохранённая копия - лучше она, чем ничего
+            return cached[0], e.attempts + ["устаревший кэш"]
+        if response.status_code == 304 and cached is not None:
+            self.cache.revalidated(url)
+            return cached[0], attempts
+        if response.status_code == 200 and self.cache is not None:
+            self.cache.put(url, response)
+        return response.text, attempts
+
+    def flush_cache(self):
+        if self.cache is not None:
+            self.cache.flush()
+
+    def close(self):
+        self.flush_cache()
+        self.session.close()
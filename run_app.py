@@ -1,6 +1,9 @@
+from multiprocessing import freeze_support
 from logic.main import MainLogic
+from logic.metrics import RunMetrics
 from ui.main import MainWindow
 
 if __name__ == "__main__":
-    logic = MainLogic()
+    freeze_support()  # пул процессов для разбора страниц из архива в собранном приложении
+    logic = MainLogic(metrics=RunMetrics())  # замеры нужны окну загрузки (самые медленные преподаватели)
     ui = MainWindow(logic)
\ No newline at end of file
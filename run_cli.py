@@ -0,0 +1,7 @@
+import sys
+from multiprocessing import freeze_support
+from logic.cli import main
+
+if __name__ == "__main__":
+    freeze_support()  # пул процессов в режиме --batch в собранном приложении
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+
+class FreeSlotsWindow(tk.Toplevel):
+    """Поиск общего свободного времени и пересечений для выбранных преподавателей."""
+
+    def __init__(self, master, logic):
+        super().__init__(master)
+        self.title("Свободное время")
+        self.geometry("760x520")
+        self.configure(bg="#FF7900")
+        self.index = logic.build_slot_index()
+
+        left = tk.Frame(self, bg="#FF7900")
+        left.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
+        tk.Label(left, text="Преподаватели:", font=("Arial", 12), bg="#FF7900").pack(anchor="w")
+        self.teachers_list = tk.Listbox(left, selectmode=tk.EXTENDED, exportselection=False,
+                                        font=("Arial", 11), width=30, height=18)
+        for teacher_name in self.index.teachers:
+            self.teachers_list.insert(tk.END, teacher_name)
+        self.teachers_list.pack(fill=tk.Y, expand=True)
+
+        self.week_var = tk.StringVar(value="both")
+        for text, value in (("Обе недели сразу", "both"), ("Нечётная", "odd"), ("Чётная", "even")):
+            tk.Radiobutton(left, text=text, value=value, variable=self.week_var, font=("Arial", 11),
+                           bg="#FF7900", activebackground="#FF7900", selectcolor="white").pack(anchor="w")
+
+        ttk.Button(left, text="Найти", style="Custom.TButton", command=self.search).pack(pady=10, fill=tk.X)
+
+        self.result = tk.Text(self, font=("Arial", 11), wrap=tk.WORD, state=tk.DISABLED)
+        self.result.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10), pady=10)
+
+    def search(self):
+        names = [self.teachers_list.get(i) for i in self.teachers_list.curselection()]
+        if not names:
+            messagebox.showwarning("Нет выбора", "Выберите одного или нескольких преподавателей.", parent=self)
+            return
+        week = self.week_var.get()
+        weeks = {"both": (0, 1), "odd": (0,), "even": (1,)}[week]
+        free = self.index.common_free(names, weeks=weeks, both_weeks=week == "both")
+        overlaps = self.index.overlaps(names, weeks=weeks)
+
+        lines = [f"Общее свободное время ({len(names)} преп.):"]
+        current_day = None
+        for week_name, day, number, time in free:
+            if (week_name, day) != current_day:
+                current_day = (week_name, day)
+                lines.append(f"\n{day}" + ("" if week_name == "Обе" else f" ({week_name.lower()} неделя)"))
+            lines.append(f"  {number} пара {time}")
+        if not free:
+            lines.append("  нет общих свободных пар")
+        if overlaps:
+            lines.append("\nПересечения занятий:")
+            for week_name, day, number, time, busy_names in overlaps:
+                lines.append(f"  {week_name}, {day}, {number} пара: {', '.join(busy_names)}")
+
+        self.result.config(state=tk.NORMAL)
+        self.result.delete("1.0", tk.END)
+        self.result.insert(tk.END, "\n".join(lines))
+        self.result.config(state=tk.DISABLED)
@@ -1,9 +1,13 @@
 import os
+import queue
 import sys
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
-from logic.main import MainLogic
+from logic.cancel import CancelToken
+from logic.main import MainLogic, prewarm_imports
+from ui.free_slots import FreeSlotsWindow
 
 
 def resource_path(relative_path):
@@ -14,8 +18,11 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+STATUS_FLUSH_MS = 100  # как часто статусы из потоков загрузки переносятся в список
+
+
 class MainWindow:
-    def __init__(self, logic: MainLogic):
+    def __init__(self, logic: MainLogic, prewarm=True):
         self.logic = logic
         self.window = tk.Tk()
         self.window.title("SFU TimeTable Builder")
@@ -23,6 +30,9 @@ class MainWindow:
         self.window.configure(bg="#FF7900")
         self.window.resizable(False, False)
         self.setup_ui()
+        if prewarm:
+            # Окно уже отрисовано - подгружаем pandas/openpyxl/bs4/requests в фоне, пока пользователь выбирает конфиг
+            self.window.after(100, lambda: threading.Thread(target=prewarm_imports, daemon=True).start())
         self.window.mainloop()
 
     def setup_ui(self):
@@ -120,40 +130,50 @@ class DownloadWindow(tk.Toplevel):
         super().__init__(master)
         self.logic = logic
         self.title("Состояние загрузки")
-        self.geometry("700x500")
+        self.geometry("820x730")
         self.configure(bg="#FF7900")
         self.resizable(False, False)
         self.keep_subgroups = tk.BooleanVar(value=False)
-
-        # === Обертка для прокрутки ===
+        # Статусы приходят из потоков загрузки в очередь и переносятся в список пачками по таймеру
+        self.status_queue = queue.SimpleQueue()
+        self.status_rows = {}  # ФИО -> строка списка, чтобы обновлять её на месте
+        self.row_teachers = {}  # строка списка -> ФИО
+        self.row_ok = {}  # ФИО -> True/False, None - ещё в очереди
+        self.counts = {True: 0, False: 0}
+        self.loading = False
+        self.cancel_token = None  # токен текущей загрузки; новая загрузка отменяет предыдущую
+        self.flush_job = None
+        self.loading_total = 0
+        self.loading_done = 0
+        self.loading_started = 0.0
+
+        # === Список статусов: Treeview рисует только видимые строки ===
         frame_container = tk.Frame(self, bg="white")
         frame_container.pack(pady=20, fill=tk.BOTH, expand=True)
 
-        canvas = tk.Canvas(frame_container, bg="white", highlightthickness=0)
-        scrollbar = tk.Scrollbar(frame_container, orient="vertical", command=canvas.yview)
-        self.status_frame = tk.Frame(canvas, bg="white")
-
-        # Привязка скролла
-        self.status_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=self.status_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.status_tree = ttk.Treeview(frame_container, columns=("teacher", "status"), show="headings",
+                                        selectmode="browse")
+        self.status_tree.heading("teacher", text="Преподаватель", anchor="w")
+        self.status_tree.heading("status", text="Статус", anchor="w")
+        self.status_tree.column("teacher", width=300, stretch=False)
+        self.status_tree.column("status", width=480)
+        self.status_tree.tag_configure("ok", foreground="#1a7f37")
+        self.status_tree.tag_configure("failed", foreground="#c62828")
+        self.status_tree.tag_configure("queued", foreground="gray")
+        scrollbar = ttk.Scrollbar(frame_container, orient="vertical", command=self.status_tree.yview)
+        self.status_tree.configure(yscrollcommand=scrollbar.set)
+        self.status_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.status_tree.bind("<Double-Button-1>", self.on_status_double_click)
 
-        self.canvas = canvas  # можно сохранить, если нужно потом прокручивать программно
-
-        self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)  # Windows/Mac
+        # Самые медленные преподаватели по замерам последней загрузки (если замеры включены)
+        self.slowest_label = tk.Label(self, text="", font=("Arial", 10), bg="#FF7900", justify=tk.LEFT, anchor="w")
+        self.slowest_label.pack(fill=tk.X, padx=20)
 
         self.loading_label = tk.Label(self, text="Загрузка расписаний...", font=("Arial", 12), bg="white")
         self.loading_label.pack(pady=10)
-        self.progress = ttk.Progressbar(self, mode='indeterminate', length=300)
+        self.progress = ttk.Progressbar(self, mode='determinate', length=300)
         self.progress.pack(pady=10)
-        self.progress.start()
 
         style = ttk.Style()
         style.configure("Custom.TButton",
@@ -203,70 +223,347 @@ class DownloadWindow(tk.Toplevel):
                                       command=self.download_schedule, state=tk.DISABLED)
         self.btn_download.pack(side=tk.LEFT, padx=10)
 
-        # Запускаем загрузку расписаний в отдельном потоке
-        threading.Thread(target=self.load_schedules, daemon=True).start()
+        self.btn_stop = ttk.Button(button_frame, text="Остановить", style="Custom.TButton",
+                                   command=self.cancel_loading, state=tk.DISABLED)
+        self.btn_stop.pack(side=tk.LEFT, padx=10)
+
+        # Частичное обновление: ошибки, устаревшие, один преподаватель (двойной щелчок по строке)
+        partial_frame = tk.Frame(self, bg="#FF7900")
+        partial_frame.pack(pady=(0, 10))
+
+        self.btn_retry_failed = ttk.Button(partial_frame, text="Повторить ошибки", style="Custom.TButton",
+                                           command=self.retry_failed, state=tk.DISABLED)
+        self.btn_retry_failed.pack(side=tk.LEFT, padx=10)
+
+        self.btn_refresh_stale = ttk.Button(partial_frame, text="Обновить устаревшие", style="Custom.TButton",
+                                            command=self.refresh_stale, state=tk.DISABLED)
+        self.btn_refresh_stale.pack(side=tk.LEFT, padx=10)
+
+        self.stale_minutes_var = tk.IntVar(value=30)
+        tk.Label(partial_frame, text="старше, мин:", font=("Arial", 12), bg="#FF7900").pack(side=tk.LEFT)
+        self.spin_stale_minutes = tk.Spinbox(partial_frame, from_=1, to=1440, width=5, font=("Arial", 12),
+                                             textvariable=self.stale_minutes_var)
+        self.spin_stale_minutes.pack(side=tk.LEFT, padx=5)
+
+        # Расписания без обращения к сайту: сохранённые страницы или прошлый запуск из базы
+        source_frame = tk.Frame(self, bg="#FF7900")
+        source_frame.pack(pady=(0, 10))
+
+        self.btn_offline = ttk.Button(source_frame, text="Из архива", style="Custom.TButton",
+                                      command=self.load_offline, state=tk.DISABLED)
+        self.btn_offline.pack(side=tk.LEFT, padx=10)
+
+        self.btn_from_store = ttk.Button(source_frame, text="Из базы", style="Custom.TButton",
+                                         command=self.load_from_store, state=tk.DISABLED)
+        self.btn_from_store.pack(side=tk.LEFT, padx=10)
+
+        # Запросы по уже загруженным расписаниям
+        tools_frame = tk.Frame(self, bg="#FF7900")
+        tools_frame.pack(pady=(0, 10))
 
-    def _on_mousewheel(self, event):
-        """Обработчик прокрутки колесика мыши с проверкой границ"""
-        # Получаем текущее положение прокрутки
-        first_visible, last_visible = self.canvas.yview()
+        self.btn_free_slots = ttk.Button(tools_frame, text="Свободное время", style="Custom.TButton",
+                                         command=self.open_free_slots, state=tk.DISABLED)
+        self.btn_free_slots.pack(side=tk.LEFT, padx=10)
 
-        # Определяем направление прокрутки
-        scroll_up = (event.num == 4 or event.delta > 0)
-        scroll_down = (event.num == 5 or event.delta < 0)
+        self.btn_group_sheets = ttk.Button(tools_frame, text="Расписания групп", style="Custom.TButton",
+                                           command=self.download_group_schedule, state=tk.DISABLED)
+        self.btn_group_sheets.pack(side=tk.LEFT, padx=10)
 
-        # Проверяем, можно ли прокручивать дальше
-        if scroll_up and first_visible > 0:
-            self.canvas.yview_scroll(-1, "units")  # Прокрутка вверх
-        elif scroll_down and last_visible < 1:
-            self.canvas.yview_scroll(1, "units")  # Прокрутка вниз
+        self.btn_room_report = ttk.Button(tools_frame, text="Аудитории", style="Custom.TButton",
+                                          command=self.download_room_report, state=tk.DISABLED)
+        self.btn_room_report.pack(side=tk.LEFT, padx=10)
 
-    def load_schedules(self):
+        self.btn_changes = ttk.Button(tools_frame, text="Изменения", style="Custom.TButton",
+                                      command=self.show_changes, state=tk.DISABLED)
+        self.btn_changes.pack(side=tk.LEFT, padx=10)
+
+        # Запускаем загрузку расписаний в отдельном потоке
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.start_loading()
+        self.flush_job = self.after(STATUS_FLUSH_MS, self.flush_status_queue)
+
+    def load_schedules(self, job, token):
+        # job(callback, cancel) - частичное обновление; по умолчанию перезагружаются все расписания
         try:
             def update_callback(teacher_name, schedule):
-                status = "ok" if isinstance(schedule, tuple) else schedule
-                self.after(0, lambda: self.update_status_list(teacher_name, status))
+                # Вызывается из потоков загрузки: только кладём статус в очередь (с токеном своей загрузки)
+                self.status_queue.put((token, teacher_name, self.logic.get_status_text(teacher_name, schedule)))
 
-            self.logic.create_combined_schedule(check_only=True, callback=update_callback)
-            self.after(0, self.stop_loading)
-        except ValueError as e:
-            self.after(0, lambda: messagebox.showerror("Ошибка", str(e)))
-            self.after(0, self.stop_loading)
-
-    def stop_loading(self):
-        self.progress.stop()
-        self.progress.pack_forget()
-        self.loading_label.pack_forget()
-        self.btn_download.config(state=tk.NORMAL)
-        self.btn_refresh.config(state=tk.NORMAL)
+            if job is None:
+                self.logic.create_combined_schedule(check_only=True, callback=update_callback, cancel=token)
+            else:
+                job(update_callback, token)
+        except Exception as e:
+            # Любая ошибка (кэш, архив, база, сеть) показывается, а окно не остаётся в режиме загрузки
+            if token is self.cancel_token:
+                message = str(e) or type(e).__name__
+                self.after(0, lambda: messagebox.showerror("Ошибка", message))
+        finally:
+            if token is self.cancel_token:
+                self.after(0, lambda: self.stop_loading(token))
+
+    def stop_loading(self, token):
+        if token is not self.cancel_token:
+            return  # эту загрузку уже сменила новая
+        self.loading = False
+        self.flush_status_queue(reschedule=False)  # статусы, пришедшие перед завершением
+        elapsed = time.monotonic() - self.loading_started
+        result = f"загружено {self.counts[True]}, с ошибками {self.counts[False]}"
+        if token.cancelled:
+            self.loading_label.config(text=f"{token.reason} через {elapsed:.1f} с: {result}")
+        else:
+            self.loading_label.config(text=f"Готово за {elapsed:.1f} с: {result}")
+        self.set_buttons_state(tk.NORMAL)
+        self.btn_stop.config(state=tk.DISABLED)
+        self.show_slowest()
+
+    def cancel_loading(self):
+        # Уже загруженные расписания остаются, их можно выгрузить
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+        self.btn_stop.config(state=tk.DISABLED)
+
+    def on_close(self):
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+        self.cancel_token = None  # статусы и завершение отменённой загрузки окну больше не нужны
+        if self.flush_job is not None:
+            self.after_cancel(self.flush_job)
+        self.destroy()
+
+    def show_slowest(self, count=3):
+        if not self.logic.metrics.enabled:
+            return
+        lines = [f"{teacher_name}: {values['latency'] + values['parse']:.2f} с "
+                 f"(ответ {values['latency']:.2f} с, разбор {values['parse']:.2f} с, повторов {values['retries']})"
+                 for teacher_name, values in self.logic.metrics.slowest(count)]
+        self.slowest_label.config(text="Дольше всего:\n" + "\n".join(lines) if lines else "")
+
+    def set_buttons_state(self, state):
+        for button in (self.btn_download, self.btn_refresh, self.btn_retry_failed, self.btn_refresh_stale,
+                       self.btn_free_slots, self.btn_group_sheets, self.btn_room_report, self.btn_changes,
+                       self.btn_offline, self.btn_from_store):
+            button.config(state=state)
 
     def update_status_list(self, teacher_name, status):
-        # Обновляем или добавляем статус конкретного преподавателя
-        for widget in self.status_frame.winfo_children():
-            if widget["text"].startswith(teacher_name):
-                widget.destroy()
+        # Обновляем или добавляем статус конкретного преподавателя, строка остаётся на своём месте
+        ok = status.startswith("ok")
+        self.set_row(teacher_name, ("✅ " if ok else "❌ ") + status, ok)
+
+    def set_row(self, teacher_name, status_text, ok):
+        previous = self.row_ok.get(teacher_name)
+        if previous is not None:
+            self.counts[previous] -= 1
+        if ok is not None:
+            self.counts[ok] += 1
+        self.row_ok[teacher_name] = ok
+        tag = "queued" if ok is None else "ok" if ok else "failed"
+        row = self.status_rows.get(teacher_name)
+        if row is None:
+            row = self.status_tree.insert("", tk.END, values=(teacher_name, status_text), tags=(tag,))
+            self.status_rows[teacher_name] = row
+            self.row_teachers[row] = teacher_name
+        else:
+            self.status_tree.item(row, values=(teacher_name, status_text), tags=(tag,))
+
+    def flush_status_queue(self, reschedule=True):
+        # Все накопившиеся статусы за один проход, затем прогресс и оценка оставшегося времени
+        updated = 0
+        while True:
+            try:
+                token, teacher_name, status = self.status_queue.get_nowait()
+            except queue.Empty:
                 break
-
-        icon = "✅" if status == "ok" else "❌"
-        label = tk.Label(self.status_frame, text=f"{teacher_name} {icon} {status}",
-                         anchor="w", font=("Arial", 12), bg="white")
-        label.pack(fill=tk.X, padx=20, pady=2)
+            if token is not self.cancel_token:
+                continue  # статус от загрузки, которую сменила новая
+            self.update_status_list(teacher_name, status)
+            updated += 1
+        if updated:
+            self.loading_done += updated
+            self.progress.config(value=min(self.loading_done, self.loading_total))
+        if self.loading:
+            self.loading_label.config(text=self.progress_text())
+        if reschedule:
+            self.flush_job = self.after(STATUS_FLUSH_MS, self.flush_status_queue)
+
+    def progress_text(self):
+        done, total = self.loading_done, self.loading_total
+        text = f"Загружено {done} из {total}: успешно {self.counts[True]}, с ошибками {self.counts[False]}"
+        if 0 < done < total:
+            remaining = (time.monotonic() - self.loading_started) / done * (total - done)
+            text += f", осталось ~{int(remaining) // 60}:{int(remaining) % 60:02d}"
+        return text
+
+    def start_loading(self, job=None, teachers=None):
+        # teachers - кого загружает job (по умолчанию все из конфигурации): их строки встают "в очередь".
+        # Идущая загрузка отменяется: новая начнётся, как только та вернёт управление
+        if self.cancel_token is not None:
+            self.cancel_token.cancel("Загрузка перезапущена")
+        token = CancelToken()
+        self.cancel_token = token
+        teachers = self.logic.teachers if teachers is None else teachers
+        for teacher in teachers:
+            self.set_row(teacher["фио"], "⏳ в очереди", None)
+        self.set_buttons_state(tk.DISABLED)
+        self.btn_refresh.config(state=tk.NORMAL)
+        self.btn_stop.config(state=tk.NORMAL)
+        self.loading = True
+        self.loading_total = len(teachers)
+        self.loading_done = 0
+        self.loading_started = time.monotonic()
+        self.progress.config(maximum=max(self.loading_total, 1), value=0)
+        self.loading_label.config(text=self.progress_text())
+        threading.Thread(target=self.load_schedules, args=(job, token), daemon=True).start()
 
     def refresh_schedule(self):
-        self.btn_refresh.config(state=tk.DISABLED)
-        self.btn_download.config(state=tk.DISABLED)
-        for widget in self.status_frame.winfo_children():
-            widget.destroy()
-        self.loading_label.pack(pady=10)
-        self.progress.pack(pady=10)
-        self.progress.start()
-        threading.Thread(target=self.load_schedules, daemon=True).start()
+        self.status_tree.delete(*self.status_tree.get_children())
+        self.status_rows.clear()
+        self.row_teachers.clear()
+        self.row_ok.clear()
+        self.counts = {True: 0, False: 0}
+        self.start_loading()
+
+    def start_refresh(self, mode, **kwargs):
+        # Частичное обновление: кого обновлять, известно заранее, поэтому прогресс считается по ним
+        try:
+            selected = self.logic.select_for_refresh(mode, **kwargs)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+        if not selected:
+            messagebox.showinfo("Обновление", "Нет расписаний для обновления.")
+            return
+        # Обновляем явно - свежие по TTL страницы перепроверяются условным запросом
+        self.start_loading(lambda callback, cancel: self.logic.fetch_schedules(selected, callback=callback,
+                                                                               revalidate=True, cancel=cancel),
+                           selected)
+
+    def retry_failed(self):
+        self.start_refresh("failed")
+
+    def refresh_stale(self):
+        try:
+            minutes = self.stale_minutes_var.get()
+        except tk.TclError:
+            messagebox.showerror("Ошибка", "Укажите возраст устаревших расписаний в минутах.")
+            return
+        self.start_refresh("stale", max_age_minutes=minutes)
+
+    def load_offline(self):
+        # Сайт недоступен: расписания из сохранённых страниц (архив или любой файл внутри каталога страниц)
+        source = filedialog.askopenfilename(
+            title="Архив или каталог сохранённых страниц",
+            filetypes=(("Архивы и страницы", "*.zip *.tar *.tar.gz *.tgz *.json *.html *.htm"), ("Все файлы", "*.*"))
+        )
+        if not source:
+            return
+        if source.lower().endswith((".json", ".html", ".htm")):
+            source = os.path.dirname(source)
+        self.start_loading(lambda callback, cancel: self.logic.load_offline(source, callback=callback, cancel=cancel))
+
+    def load_from_store(self):
+        # Последний сохранённый запуск этого конфига - после перезапуска приложения не нужно качать всё заново
+        self.start_loading(lambda callback, cancel: self.logic.load_from_store(callback=callback, cancel=cancel))
+
+    def on_status_double_click(self, event):
+        row = self.status_tree.identify_row(event.y)
+        if row:
+            self.refresh_teacher(self.row_teachers[row])
+
+    def refresh_teacher(self, teacher_name):
+        if self.loading:
+            return  # загрузка уже идёт
+        self.start_refresh("teacher", teacher_name=teacher_name)
+
+    def open_free_slots(self):
+        if "ok" not in self.logic.get_teacher_statuses().values():
+            messagebox.showwarning("Нет данных", "Нет успешно загруженных расписаний.")
+            return
+        FreeSlotsWindow(self, self.logic)
+
+    def download_group_schedule(self):
+        file_path = filedialog.asksaveasfilename(
+            title="Сохранить расписания групп",
+            defaultextension=".xlsx",
+            filetypes=(("Excel files", "*.xlsx"), ("All files", "*.*"))
+        )
+        if not file_path:
+            return
+        try:
+            self.logic.save_group_schedule(file_path)
+            messagebox.showinfo("Готово", "Расписания групп сохранены.")
+        except (ValueError, PermissionError) as e:
+            messagebox.showerror("Ошибка", str(e))
+
+    def download_room_report(self):
+        file_path = filedialog.asksaveasfilename(
+            title="Сохранить загрузку аудиторий",
+            defaultextension=".xlsx",
+            filetypes=(("Excel files", "*.xlsx"), ("All files", "*.*"))
+        )
+        if not file_path:
+            return
+        try:
+            self.logic.save_room_report(file_path)
+            messagebox.showinfo("Готово", "Отчёт о загрузке аудиторий сохранён.")
+        except (ValueError, PermissionError) as e:
+            messagebox.showerror("Ошибка", str(e))
+
+    def show_changes(self):
+        # Сравнение последней загрузки с предыдущей для этого же конфига
+        try:
+            changes, previous = self.logic.diff_with_previous()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать снимки расписаний: {e}")
+            return
+        if changes is None:
+            messagebox.showinfo("Изменения", "Нет предыдущей загрузки этого конфига для сравнения.")
+            return
+        if not changes:
+            messagebox.showinfo("Изменения", "С прошлой загрузки расписания не изменились.")
+            return
+        teachers = sorted({change["teacher"] for change in changes})
+        if not messagebox.askyesno("Изменения", f"Изменений: {len(changes)} у преподавателей: {len(teachers)}\n"
+                                                + "\n".join(teachers[:15]) + "\n\nСохранить список изменений?"):
+            return
+        file_path = filedialog.asksaveasfilename(
+            title="Сохранить изменения",
+            defaultextension=".xlsx",
+            filetypes=(("Excel files", "*.xlsx"), ("All files", "*.*"))
+        )
+        if not file_path:
+            return
+        from logic.snapshots import save_diff
+        base_path = os.path.splitext(file_path)[0]
+        try:
+            json_path, xlsx_path = save_diff(base_path, changes, previous, self.logic.last_snapshot)
+            messagebox.showinfo("Готово", f"Изменения сохранены:\n{xlsx_path}\n{json_path}")
+        except PermissionError:
+            messagebox.showerror("Ошибка", f"Ошибка сохранения, возможно файл открыт ({base_path})")
 
     def download_schedule(self):
         try:
-            self.logic.create_combined_schedule(save_file=True, keep_groups=self.keep_subgroups_var.get())
+            tables = self.logic.create_combined_schedule(keep_groups=self.keep_subgroups_var.get())
+            file_path = filedialog.asksaveasfilename(
+                title="Сохранить объединенное расписание",
+                defaultextension=".xlsx",
+                filetypes=(("Excel files", "*.xlsx"),
+                           ("CSV (файл на таблицу)", "*.csv"),
+                           ("JSON Lines", "*.jsonl"),
+                           ("Parquet (файл на таблицу)", "*.parquet"),
+                           ("Календари iCalendar (каталог по преподавателям)", "*.ics"),
+                           ("All files", "*.*"))
+            )
+            if not file_path:
+                messagebox.showwarning("Отменено", "Сохранение файла было отменено.")
+                return
+            error_teachers = self.logic.get_error_teachers()
+            if error_teachers:
+                messagebox.showwarning("Предупреждение", "Расписание создано, но есть ошибки:\n" + "\n".join(error_teachers))
+            self.logic.save_schedule(file_path, tables)
+            messagebox.showinfo("Готово", "Объединённое расписание успешно создано!")
             #self.destroy()
         except ValueError as e:
             messagebox.showerror("Ошибка", str(e))
         except PermissionError as e:
-            messagebox.showerror("Ошибка", str(e))
\ No newline at end of file
+            messagebox.showerror("Ошибка", str(e))